@@ -0,0 +1,81 @@
+"""Optional on-disk store for generated documents, isolated per UI session.
+
+Disabled unless PDD_ARTIFACT_DIR is set; the app otherwise serves every
+document straight from memory.
+"""
+
+import os
+import re
+import shutil
+import threading
+import time
+
+ARTIFACT_DIR = os.getenv("PDD_ARTIFACT_DIR", "")
+# files kept per session, and how long an idle session folder survives
+ARTIFACT_RETENTION = int(os.getenv("PDD_ARTIFACT_RETENTION", "5"))
+ARTIFACT_MAX_AGE_HOURS = float(os.getenv("PDD_ARTIFACT_MAX_AGE_HOURS", "24"))
+
+
+def _safe_name(value):
+    return re.sub(r"[^A-Za-z0-9._-]", "_", value).strip("._") or "artifact"
+
+
+class ArtifactStore:
+
+    def __init__(self, root, retention=ARTIFACT_RETENTION, max_age_hours=ARTIFACT_MAX_AGE_HOURS):
+        self.root = root
+        self.retention = max(1, retention)
+        self.max_age_seconds = max_age_hours * 3600
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def session_dir(self, session_id):
+        return os.path.join(self.root, _safe_name(session_id))
+
+    def save(self, session_id, filename, data):
+        folder = self.session_dir(session_id)
+        path = os.path.join(folder, _safe_name(os.path.basename(filename)))
+        with self._lock:
+            os.makedirs(folder, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._prune_session(folder)
+            self._prune_stale_sessions()
+        return path
+
+    def _prune_session(self, folder):
+        # newest files win; everything past the retention limit is removed
+        paths = [os.path.join(folder, name) for name in os.listdir(folder) if not name.endswith(".tmp")]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[self.retention:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _prune_stale_sessions(self):
+        cutoff = time.time() - self.max_age_seconds
+        for name in os.listdir(self.root):
+            folder = os.path.join(self.root, name)
+            try:
+                if os.path.isdir(folder) and os.path.getmtime(folder) < cutoff:
+                    shutil.rmtree(folder, ignore_errors=True)
+            except OSError:
+                pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    # one store per process, so its lock covers every job's save and prune
+    global _store
+    if not ARTIFACT_DIR:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore(ARTIFACT_DIR)
+        return _store
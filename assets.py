@@ -0,0 +1,84 @@
+"""Logo and banner images prepared for the size they are shown at in the DOCX.
+
+A configured logo or banner can be far larger than the 1.1 or 7 inches it
+is drawn at. prepare_image scales it down to that width at PDD_IMAGE_DPI
+(never up) and recompresses it: optimized PNG, or JPEG for opaque images
+when that is smaller. The original bytes are kept when nothing would be
+gained. Results are cached by the hash of the source file, in memory and
+in a directory shared between processes, so every image is processed once.
+
+    PDD_IMAGE_DPI            print resolution at the display width (default 220)
+    PDD_IMAGE_JPEG_QUALITY   quality of JPEG recompression, 0 keeps PNG (default 90)
+    PDD_ASSET_CACHE_DIR      cache directory ("" keeps the cache in memory only)
+"""
+
+import hashlib
+import io
+import os
+
+from PIL import Image, ImageOps
+
+from cache_store import CacheStore
+
+IMAGE_DPI = int(os.getenv("PDD_IMAGE_DPI", "220"))
+JPEG_QUALITY = int(os.getenv("PDD_IMAGE_JPEG_QUALITY", "90"))
+ASSET_CACHE_SIZE = int(os.getenv("PDD_ASSET_CACHE_SIZE", "32"))
+ASSET_CACHE_DIR = os.getenv("PDD_ASSET_CACHE_DIR", os.path.join(".cache", "assets"))
+# bump when the processing below changes
+ASSET_VERSION = 1
+
+_cache = CacheStore(ASSET_CACHE_SIZE, ASSET_CACHE_DIR, suffix=".img")
+
+
+def asset_key(source, width_inches, dpi=IMAGE_DPI):
+    payload = f"{ASSET_VERSION}:{width_inches}:{dpi}:{JPEG_QUALITY}:".encode("ascii")
+    return hashlib.sha256(payload + source).hexdigest()
+
+
+def _encode(image, fmt, **params):
+    buf = io.BytesIO()
+    image.save(buf, format=fmt, **params)
+    return buf.getvalue()
+
+
+def _is_opaque(image):
+    if image.mode in ("RGB", "L", "CMYK"):
+        return True
+    if image.mode in ("RGBA", "LA"):
+        return image.getchannel("A").getextrema()[0] == 255
+    return False
+
+
+def optimize_image(source, width_inches, dpi=IMAGE_DPI):
+    # source: image file bytes -> image bytes for a picture width_inches wide
+    try:
+        with Image.open(io.BytesIO(source)) as original:
+            image = ImageOps.exif_transpose(original)
+            resized = False
+            target = max(1, round(width_inches * dpi))
+            if image.width > target:
+                height = max(1, round(image.height * target / image.width))
+                image = image.resize((target, height), Image.LANCZOS)
+                resized = True
+            if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+                image = image.convert("RGBA")
+            candidates = [_encode(image, "PNG", optimize=True)]
+            if JPEG_QUALITY and _is_opaque(image):
+                rgb = image.convert("L" if image.mode in ("L", "LA") else "RGB")
+                candidates.append(_encode(rgb, "JPEG", quality=JPEG_QUALITY, optimize=True))
+    except (OSError, ValueError):
+        # not something Pillow reads (EMF, WMF...): python-docx embeds it as is
+        return source
+    if not resized:
+        candidates.append(source)
+    return min(candidates, key=len)
+
+
+def prepare_image(path, width_inches, dpi=IMAGE_DPI):
+    # returns a stream for run.add_picture(..., width=Inches(width_inches));
+    # the same file at the same width always gives the same bytes, so
+    # python-docx stores it once however often it is placed
+    with open(path, "rb") as f:
+        source = f.read()
+    key = asset_key(source, width_inches, dpi)
+    return io.BytesIO(_cache.get_or_build(key, lambda: optimize_image(source, width_inches, dpi)))
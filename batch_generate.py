@@ -0,0 +1,162 @@
+"""Headless batch generation of PDDs for a folder of .txt/.docx process files.
+
+    python batch_generate.py INPUT_DIR OUTPUT_DIR [--concurrency 4] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+from groq import Groq
+
+from extract import extract_text
+from scheduler import BATCH, request_priority
+from pipeline import (
+    load_config,
+    resolve_document_meta,
+    generate_llm_content,
+    build_and_save,
+    document_filename,
+    compile_client_skeletons,
+    GENERATION_MODES,
+    GENERATION_MODE,
+)
+
+INPUT_EXTENSIONS = (".txt", ".docx")
+
+
+def find_inputs(input_dir, recursive=False):
+    paths = []
+    for root, _dirs, files in os.walk(input_dir):
+        for name in sorted(files):
+            if name.lower().endswith(INPUT_EXTENSIONS) and not name.startswith("~$"):
+                paths.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def output_paths(inputs, input_dir, output_dir, config):
+    # input path -> output path; sub-folders are mirrored, and names that would
+    # still be the same (x.txt and x.docx, a_b.txt and a-b.txt) get _2, _3...
+    branding, _contacts, _company, clients = config
+    paths, taken = {}, set()
+    for path in inputs:
+        folder = os.path.relpath(os.path.dirname(path), input_dir)
+        title = resolve_document_meta(clients, branding, source_name=path)["title"]
+        output_path = os.path.normpath(os.path.join(output_dir, folder, document_filename(title)))
+        stem, ext = os.path.splitext(output_path)
+        suffix = 2
+        # compared without case: Windows and macOS file systems ignore it
+        while output_path.lower() in taken:
+            output_path = f"{stem}_{suffix}{ext}"
+            suffix += 1
+        taken.add(output_path.lower())
+        paths[path] = output_path
+    return paths
+
+
+def read_input(path):
+    # every file is read once and in full, so no budget and no memo
+    text, _truncated = extract_text(path, max_chars=None, memoize=False)
+    return text
+
+
+async def process_file(path, output_path, args, client, config, llm_slots, build_pool):
+    branding, contacts, company, clients = config
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+
+    process_context = await asyncio.to_thread(read_input, path)
+    if not process_context.strip():
+        raise ValueError("input file is empty")
+    meta = resolve_document_meta(clients, branding, source_name=path)
+
+    # LLM stage: bounded number of documents talking to Groq at once
+    async with llm_slots:
+        content = await asyncio.to_thread(
+            generate_llm_content, client, process_context, meta["title"], not args.no_cache, args.mode
+        )
+
+    # CPU stage: DOCX + graphviz run in a separate process
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    await loop.run_in_executor(
+        build_pool, build_and_save,
+        output_path, meta, content["sections"], content["flow_data"], contacts, company
+    )
+    return output_path, time.perf_counter() - started
+
+
+async def run_one(path, *args):
+    try:
+        output_path, elapsed = await process_file(path, *args)
+        return path, output_path, elapsed, None
+    except Exception as e:
+        return path, None, None, e
+
+
+async def run_batch(args):
+    inputs = find_inputs(args.input_dir, args.recursive)
+    if not inputs:
+        print(f"No {'/'.join(INPUT_EXTENSIONS)} files found in {args.input_dir}")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    api_key = os.getenv("GROQ_API_KEY")
+    # retries are handled by the shared scheduler (scheduler.py), not the SDK
+    client = Groq(api_key=api_key, max_retries=0) if api_key else None
+    if client is None:
+        print("GROQ_API_KEY is not set - documents will contain placeholder content.")
+    config = load_config()
+    # compile client skeletons once up front so build workers load them from disk
+    compile_client_skeletons(config)
+    llm_slots = asyncio.Semaphore(max(1, args.concurrency))
+
+    started = time.perf_counter()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as build_pool:
+        outputs = output_paths(inputs, args.input_dir, args.output_dir, config)
+        tasks = [run_one(path, outputs[path], args, client, config, llm_slots, build_pool) for path in inputs]
+        for done in asyncio.as_completed(tasks):
+            path, output_path, elapsed, error = await done
+            name = os.path.relpath(path, args.input_dir)
+            if error is None:
+                print(f"[ok]   {name} -> {os.path.relpath(output_path, args.output_dir)} ({elapsed:.1f}s)")
+            else:
+                failures += 1
+                print(f"[fail] {name}: {error}")
+    elapsed = time.perf_counter() - started
+
+    succeeded = len(inputs) - failures
+    per_minute = succeeded / elapsed * 60 if elapsed else 0.0
+    print(f"\n{succeeded}/{len(inputs)} documents in {elapsed:.1f}s "
+          f"({per_minute:.1f} documents/min), {failures} failed")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build Process Design Documents for a folder of inputs.")
+    parser.add_argument("input_dir", help="folder with .txt / .docx process descriptions")
+    parser.add_argument("output_dir", help="folder the generated .docx files are written to")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="documents in the LLM stage at the same time (default: 4)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes used for DOCX/flowchart building (default: CPU count)")
+    parser.add_argument("--recursive", action="store_true", help="also look in sub-folders")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the LLM response cache")
+    parser.add_argument("--mode", choices=GENERATION_MODES, default=GENERATION_MODE,
+                        help="per_section: one call per section; structured: one JSON call for all")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    # batch calls yield to interactive ones when they share a scheduler
+    with request_priority(BATCH):
+        return asyncio.run(run_batch(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Load test: N concurrent users driving the real Streamlit page.
+
+    python -m benchmarks.bench_app_load --concurrency 1,2,4,8,16 --latency-scale 0.25
+
+Every simulated user is its own AppTest session of app.py in this process, so
+they share the job queue, the Groq client and the caches the way sessions of
+one `streamlit run` server do; the Groq client is the fake one from
+fake_groq.py. A user opens the page, uploads a generated .docx (or .txt)
+process file, clicks Generate, polls until the job is done (the page polls
+every second) and downloads the document. Concurrency ramps level by level
+with fresh inputs, and each level reports:
+
+    generate p50/p90/p99   click -> document ready, as the user sees it
+    page run p50/p95       one script run (upload, click, poll), what every
+                           interaction costs while the others generate
+    errors                 failed, cancelled or timed-out generations
+    CPU cores / RSS        process CPU time per second of wall time, and the
+                           highest resident memory seen during the level
+
+AppTest swaps one global runtime in and out per script run, so script runs
+take turns on a lock; on a real server they take turns on the GIL instead.
+The generation itself runs on the app's own job threads, unserialized. CPU
+and memory include the harness (each AppTest run also parses the page).
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+sys.path.insert(0, ROOT)
+
+from benchmarks.offline import Sampler, use_throwaway_caches  # noqa: E402
+
+use_throwaway_caches("pdd_load_")
+os.environ.setdefault("GROQ_API_KEY", "fake")
+# every user brings a new document; don't offer earlier ones for reuse
+os.environ.setdefault("PDD_SIMILARITY_PATH", "")
+
+from benchmarks.bench_pipeline import flowchart_error, percentile, synthetic_process  # noqa: E402
+from benchmarks.fake_groq import FakeGroq  # noqa: E402
+
+GENERATE_LABEL = "Generate Process Design Document"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+POLL_SECONDS = 1.0      # app.JOB_POLL_SECONDS
+
+# AppTest installs a mock runtime globally for the length of one script run
+_script_lock = threading.Lock()
+
+
+def make_upload(size, seed, fmt):
+    text = synthetic_process(size, seed=seed)
+    if fmt == "txt":
+        return f"process_{seed}.txt", text.encode("utf-8"), "text/plain"
+    from docx import Document
+    doc = Document()
+    for line in text.split("\n"):
+        doc.add_paragraph(line)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return f"process_{seed}.docx", buf.getvalue(), DOCX_MIME
+
+
+class User:
+
+    def __init__(self, upload, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.upload = upload
+        self.timeout = timeout
+        self.page_runs = []
+
+    def run(self, action=None):
+        started = time.perf_counter()
+        with _script_lock:
+            if action:
+                action()
+            self.at.run()
+        self.page_runs.append(time.perf_counter() - started)
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+    def generate(self):
+        # -> (seconds from click to document, document bytes)
+        from docx import Document
+        from jobs import get_job_queue
+        at = self.at
+        self.run()
+        self.run(lambda: at.file_uploader[0].set_value(self.upload))
+        started = time.perf_counter()
+        self.run(lambda: next(b for b in at.button if b.label == GENERATE_LABEL).click())
+        while not (at.success or at.error or at.warning):
+            if time.perf_counter() - started > self.timeout:
+                raise TimeoutError(f"no document after {self.timeout:.0f}s")
+            time.sleep(POLL_SECONDS)
+            self.run()
+        elapsed = time.perf_counter() - started
+        if not at.success:
+            raise RuntimeError((at.error or at.warning)[0].value)
+        # the bytes behind the download button
+        data = get_job_queue().get(at.session_state["job_id"]).data
+        zipfile.ZipFile(io.BytesIO(data)).testzip()
+        error = flowchart_error(Document(io.BytesIO(data)))
+        if error:
+            raise RuntimeError(error)
+        return elapsed, data
+
+
+def run_level(users, args, seed):
+    uploads = [make_upload(args.size, seed + i, args.format) for i in range(users)]
+    latencies, page_runs, errors = [], [], []
+    lock = threading.Lock()
+
+    def one_user(upload):
+        user = User(upload, args.timeout)
+        try:
+            for _ in range(args.docs):
+                elapsed, _data = user.generate()
+                with lock:
+                    latencies.append(elapsed)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+        with lock:
+            page_runs.extend(user.page_runs)
+
+    threads = [threading.Thread(target=one_user, args=(upload,)) for upload in uploads]
+    cpu_before, started = time.process_time(), time.perf_counter()
+    with Sampler() as sampler:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - started
+    docs = users * args.docs
+
+    if args.verbose:
+        for error in errors:
+            print(f"  {error}")
+    return {
+        "users": users,
+        "docs": docs,
+        "errors": docs - len(latencies),
+        "error_rate": (docs - len(latencies)) / docs,
+        "p50_s": percentile(latencies, 50),
+        "p90_s": percentile(latencies, 90),
+        "p99_s": percentile(latencies, 99),
+        "page_p50_ms": percentile(page_runs, 50) * 1000,
+        "page_p95_ms": percentile(page_runs, 95) * 1000,
+        "docs_per_min": len(latencies) / wall * 60 if wall else 0.0,
+        "cpu_cores": (time.process_time() - cpu_before) / wall if wall else 0.0,
+        "peak_rss_mb": sampler.peak_mb,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-user load test of the Streamlit page (no API calls).")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma separated numbers of simultaneous users")
+    parser.add_argument("--docs", type=int, default=1, help="documents each user generates, one after another")
+    parser.add_argument("--size", type=int, default=20000, help="characters in each uploaded process file")
+    parser.add_argument("--format", choices=["docx", "txt"], default="docx", help="uploaded file type")
+    parser.add_argument("--latency-scale", type=float, default=0.25,
+                        help="multiplier on the fake per-model latency (1.0 ~ real Groq)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before a generation counts as failed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    import groq
+    # one shared client, as get_client() caches it for every session
+    client = FakeGroq(latency_scale=args.latency_scale, error_rate=args.error_rate, seed=args.seed)
+    groq.Groq = lambda api_key=None, **_kwargs: client
+    os.chdir(ROOT)
+
+    header = (f"{'users':>5} {'docs':>5} {'err%':>5} {'p50 s':>7} {'p90 s':>7} {'p99 s':>7} "
+              f"{'page p50/p95 ms':>16} {'docs/min':>9} {'CPU cores':>9} {'peak RSS MB':>12}")
+    print(header)
+    print("-" * len(header))
+    results = []
+    seed = args.seed
+    for users in [int(n) for n in args.concurrency.split(",") if n.strip()]:
+        row = run_level(users, args, seed)
+        seed += users       # new inputs every level, so nothing is answered from cache
+        results.append(row)
+        print(f"{row['users']:>5} {row['docs']:>5} {row['error_rate'] * 100:>5.1f} {row['p50_s']:>7.2f} "
+              f"{row['p90_s']:>7.2f} {row['p99_s']:>7.2f} "
+              f"{row['page_p50_ms']:>7.1f} / {row['page_p95_ms']:<6.1f} {row['docs_per_min']:>9.1f} "
+              f"{row['cpu_cores']:>9.2f} {row['peak_rss_mb']:>12.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
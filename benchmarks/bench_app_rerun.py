@@ -0,0 +1,81 @@
+"""Cold start and idle rerun cost of the Streamlit page.
+
+    python -m benchmarks.bench_app_rerun --reruns 30
+
+Runs app.py headless through streamlit.testing, once cold (fresh interpreter,
+nothing imported yet) and then repeatedly with no widget changes, which is
+what every interaction costs before any work is done. The script body is
+timed from inside the script run; the harness' own rendering of the page is
+reported separately.
+"""
+
+import argparse
+import builtins
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+HEAVY_MODULES = ["groq", "pandas", "docx", "graphviz", "lxml", "numpy", "pipeline"]
+
+# runs app.py as the page and records how long its body took; the code is
+# compiled once, as Streamlit does for the real script
+TIMED_PAGE = """
+import builtins, time
+if not hasattr(builtins, "_pdd_app_code"):
+    with open({app!r}) as f:
+        builtins._pdd_app_code = compile(f.read(), {app!r}, "exec")
+_started = time.perf_counter()
+exec(builtins._pdd_app_code, {{"__name__": "__main__", "__file__": {app!r}}})
+builtins._pdd_script_times.append(time.perf_counter() - _started)
+"""
+
+
+def time_reruns(reruns):
+    from streamlit.testing.v1 import AppTest
+
+    builtins._pdd_script_times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        page = os.path.join(tmp, "timed_app.py")
+        with open(page, "w") as f:
+            f.write(TIMED_PAGE.format(app=APP_PATH))
+        at = AppTest.from_file(page, default_timeout=120)
+        started = time.perf_counter()
+        at.run()
+        cold = time.perf_counter() - started
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        wall = []
+        for _ in range(reruns):
+            started = time.perf_counter()
+            at.run()
+            wall.append(time.perf_counter() - started)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return cold, builtins._pdd_script_times[1:], wall, loaded
+
+
+def p90(values):
+    return sorted(values)[max(0, int(len(values) * 0.9) - 1)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit page cold start / idle rerun benchmark.")
+    parser.add_argument("--reruns", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    cold, script, wall, loaded = time_reruns(args.reruns)
+
+    print(f"cold first run            {cold * 1000:8.0f} ms")
+    print(f"idle rerun, script p50/p90 {statistics.median(script) * 1000:7.1f} / {p90(script) * 1000:.1f} ms")
+    print(f"idle rerun, with harness  {statistics.median(wall) * 1000:8.1f} ms")
+    print(f"heavy modules loaded      {', '.join(loaded) or 'none'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
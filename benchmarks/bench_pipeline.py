@@ -0,0 +1,159 @@
+"""Offline benchmark of the full PDD pipeline against the fake Groq client.
+
+    python -m benchmarks.bench_pipeline --sizes 2000,20000,200000 --runs 5 --latency-scale 0.1
+
+Runs summary, sections, flow JSON, flowchart rendering and DOCX assembly
+for synthetic inputs of increasing size and reports p50/p95 latency,
+documents/sec and the highest RSS sampled while each size ran. Response/
+flowchart disk caches are pointed at a throwaway directory and bypassed so
+every run does the work.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.offline import Sampler, use_throwaway_caches  # noqa: E402
+
+use_throwaway_caches("pdd_bench_")
+
+import pipeline  # noqa: E402
+from benchmarks.fake_groq import FakeGroq  # noqa: E402
+
+SYSTEMS = ["SAP", "Salesforce", "ServiceNow", "Outlook", "Excel", "SharePoint", "Oracle EBS"]
+ACTIONS = ["receives", "validates", "updates", "approves", "reconciles", "uploads", "notifies"]
+
+
+def synthetic_process(size, seed=0):
+    # deterministic SOP-like text of roughly `size` characters
+    rng = random.Random(seed)
+    lines = ["KMG Invoice Processing Standard Operating Procedure"]
+    step = 1
+    while sum(len(line) + 1 for line in lines) < size:
+        system = rng.choice(SYSTEMS)
+        action = rng.choice(ACTIONS)
+        if step % 7 == 0:
+            lines.append(f"Step {step}: If the record in {system} is incomplete, the analyst returns it "
+                         f"to the requester; otherwise the process continues.")
+        else:
+            lines.append(f"Step {step}: The analyst {action} the invoice details in {system} and records "
+                         f"the reference number {rng.randint(10000, 99999)}.")
+        step += 1
+    return "\n".join(lines)[:size]
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def flowchart_error(doc):
+    # the pipeline writes a note instead of failing when graphviz can't draw;
+    # for the benchmark that run did not cover the whole pipeline
+    for paragraph in reversed(doc.paragraphs):
+        if paragraph.text.startswith(pipeline.FLOWCHART_ERROR):
+            return paragraph.text
+    return None
+
+
+def run_once(client, text, config, mode):
+    started = time.perf_counter()
+    doc, _fname = pipeline.generate_pdd(client, text, manual_text=text, use_cache=False, config=config,
+                                        mode=mode)
+    data = pipeline.document_to_bytes(doc)
+    elapsed = time.perf_counter() - started
+    error = flowchart_error(doc)
+    if error:
+        raise RuntimeError(error)
+    return elapsed, len(data)
+
+
+def bench_size(size, args, config):
+    client = FakeGroq(latency_scale=args.latency_scale, jitter=args.jitter, error_rate=args.error_rate,
+                      retry_after=args.retry_after, flow_nodes=args.flow_nodes, seed=args.seed + size)
+    texts = [synthetic_process(size, seed=args.seed + i) for i in range(args.runs)]
+    latencies, sizes, errors = [], [], 0
+
+    started = time.perf_counter()
+    with Sampler() as sampler, ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+        futures = [pool.submit(run_once, client, text, config, args.mode) for text in texts]
+        for fut in futures:
+            try:
+                latency, docx_bytes = fut.result()
+                latencies.append(latency)
+                sizes.append(docx_bytes)
+            except Exception as e:
+                errors += 1
+                if args.verbose:
+                    print(f"  run failed: {type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - started
+
+    return {
+        "input_chars": size,
+        "runs": args.runs,
+        "errors": errors,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "mean_s": statistics.fmean(latencies) if latencies else float("nan"),
+        "docs_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "docx_kb": statistics.fmean(sizes) / 1024 if sizes else float("nan"),
+        "llm_calls": client.calls,
+        "prompt_tokens": client.prompt_tokens,
+        "completion_tokens": client.completion_tokens,
+        "rate_limited": client.rate_limited,
+        "peak_rss_mb": sampler.peak_mb,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline PDD pipeline benchmark (no API calls).")
+    parser.add_argument("--sizes", default="2000,20000,100000,500000",
+                        help="comma separated input sizes in characters")
+    parser.add_argument("--runs", type=int, default=5, help="documents per input size")
+    parser.add_argument("--parallel", type=int, default=1, help="documents generated at the same time")
+    parser.add_argument("--latency-scale", type=float, default=0.1,
+                        help="multiplier on the fake per-model latency (1.0 ~ real Groq)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="+/- fraction of latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--flow-nodes", type=int, default=None,
+                        help="fixed flow graph size (default: grows with the prompt)")
+    parser.add_argument("--mode", choices=pipeline.GENERATION_MODES, default="per_section",
+                        help="section generation mode to benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    config = pipeline.load_config()
+    results = []
+    header = (f"{'chars':>8} {'runs':>5} {'err':>4} {'p50 s':>8} {'p95 s':>8} "
+              f"{'docs/s':>7} {'docx KB':>8} {'calls':>6} {'in tok':>8} {'429s':>5} {'peak RSS MB':>12}")
+    print(header)
+    print("-" * len(header))
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        row = bench_size(size, args, config)
+        results.append(row)
+        print(f"{row['input_chars']:>8} {row['runs']:>5} {row['errors']:>4} {row['p50_s']:>8.3f} "
+              f"{row['p95_s']:>8.3f} {row['docs_per_sec']:>7.2f} {row['docx_kb']:>8.1f} "
+              f"{row['llm_calls']:>6} {row['prompt_tokens']:>8} {row['rate_limited']:>5} "
+              f"{row['peak_rss_mb']:>12.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
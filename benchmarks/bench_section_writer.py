@@ -0,0 +1,86 @@
+"""Benchmark of the section body writer on very long generated sections.
+
+    python -m benchmarks.bench_section_writer --lines 500,2000,8000
+
+Compares pipeline.SectionBlockWriter with the previous approach, which
+read doc.paragraphs[-1] for every scope line and appended through
+doc.add_paragraph.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document  # noqa: E402
+from docx.shared import Inches, Pt  # noqa: E402
+
+from pipeline import SectionBlockWriter, classify_block, set_font  # noqa: E402
+
+
+def synthetic_section(line_count):
+    pattern = [
+        "The analyst validates each request against the approval matrix before it is released.",
+        "The following systems are involved:",
+        "Invoice workbench",
+        "In scope",
+        "Vendor master data checks",
+        "Out of scope",
+        "Payment run execution",
+    ]
+    return "\n".join(pattern[i % len(pattern)] for i in range(line_count))
+
+
+def legacy_write(doc, content):
+    for block in content.split("\n"):
+        block = block.strip()
+        if not block:
+            continue
+        kind = classify_block(block)
+        if kind == "scope":
+            if doc.paragraphs and doc.paragraphs[-1].text.strip().lower() == block.lower():
+                continue
+            p = doc.add_paragraph(style="List Bullet")
+            set_font(p.add_run(block.title()), size=11)
+        elif kind == "list":
+            p = doc.add_paragraph(style="List Bullet 2")
+            set_font(p.add_run(block.capitalize()), size=11)
+            p.paragraph_format.left_indent = Inches(0.5)
+            p.paragraph_format.first_line_indent = Inches(-0.25)
+        else:
+            para = doc.add_paragraph(block)
+            para.paragraph_format.space_after = Pt(6)
+            for run in para.runs:
+                set_font(run, size=11)
+
+
+def builder_write(doc, content):
+    SectionBlockWriter(doc, doc.add_paragraph("SCOPE")).write(content)
+
+
+def timed(writer, content):
+    doc = Document()
+    started = time.perf_counter()
+    writer(doc, content)
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Section body writer benchmark.")
+    parser.add_argument("--lines", default="500,2000,8000", help="comma separated section lengths")
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the block builder")
+    args = parser.parse_args(argv)
+
+    print(f"{'lines':>7} {'legacy s':>10} {'builder s':>10} {'builder us/line':>16}")
+    for count in [int(n) for n in args.lines.split(",") if n.strip()]:
+        content = synthetic_section(count)
+        legacy = float("nan") if args.skip_legacy else timed(legacy_write, content)
+        builder = timed(builder_write, content)
+        print(f"{count:>7} {legacy:>10.3f} {builder:>10.3f} {builder / count * 1e6:>16.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
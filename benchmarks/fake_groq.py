@@ -0,0 +1,153 @@
+"""Deterministic stand-in for the Groq client, for offline benchmarks and load tests.
+
+Mimics ``client.chat.completions.create`` closely enough for pipeline.py:
+per-model latency with jitter, optional 429s (raised as groq.RateLimitError
+with a Retry-After header), usage token counts, ``stream=True`` chunks and
+canned flow JSON graphs whose size can be fixed or derived from the prompt.
+"""
+
+import json
+import random
+import threading
+import time
+import types
+
+import httpx
+from groq import RateLimitError
+
+# seconds per call before latency_scale, roughly what Groq shows for these models
+MODEL_LATENCY = {
+    "llama-3.1-8b-instant": 0.4,
+    "llama-3.3-70b-versatile": 1.5,
+}
+DEFAULT_LATENCY = 1.0
+# streamed responses: share of the latency spent before the first token
+FIRST_TOKEN_SHARE = 0.3
+STREAM_CHUNK_CHARS = 16
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+SECTION_TEXT = (
+    "This document describes the {title} process as it is operated today, including the business "
+    "context, the systems that are involved and the hand-offs between the teams that own each step.\n"
+    "The following roles use this document:\n"
+    "Process owner\n"
+    "Operations analyst\n"
+    "Automation developer\n"
+    "The process starts when a request is received and ends when the outcome is recorded.\n"
+    "In scope\n"
+    "Request intake and validation\n"
+    "Out of scope\n"
+    "Downstream reporting\n"
+)
+
+
+def _usage(prompt, content):
+    prompt_tokens = len(prompt) // 4 + 1
+    completion_tokens = len(content) // 4 + 1
+    return types.SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                 total_tokens=prompt_tokens + completion_tokens)
+
+
+def make_flow_graph(node_count, rng):
+    # a chain of actions with a decision every few steps that loops back
+    nodes = [{"id": "1", "label": "Start", "type": "start"}]
+    edges = []
+    for i in range(2, node_count):
+        if i % 5 == 0:
+            nodes.append({"id": str(i), "label": f"Is step {i - 1} valid?", "type": "decision"})
+            edges.append({"from": str(i - 1), "to": str(i)})
+            edges.append({"from": str(i), "to": str(max(1, i - rng.randint(1, 3))), "label": "No"})
+        else:
+            nodes.append({"id": str(i), "label": f"Perform step {i} in system", "type": "action"})
+            edges.append({"from": str(i - 1), "to": str(i),
+                          "label": "Yes" if (i - 1) % 5 == 0 else ""})
+    end_id = str(max(2, node_count))
+    nodes.append({"id": end_id, "label": "End", "type": "end"})
+    edges.append({"from": nodes[-2]["id"], "to": end_id})
+    return {"nodes": nodes, "edges": edges}
+
+
+class FakeCompletions:
+
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, messages, model, response_format=None, stream=False, **kwargs):
+        return self._owner._complete(messages, model, response_format, stream, **kwargs)
+
+
+class FakeGroq:
+
+    def __init__(self, api_key=None, latency_scale=1.0, jitter=0.2, error_rate=0.0,
+                 retry_after=1.0, flow_nodes=None, seed=0, **_kwargs):
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        # None -> graph size grows with the prompt, like a real model would
+        self.flow_nodes = flow_nodes
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.chat = types.SimpleNamespace(completions=FakeCompletions(self))
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            return self._rng.random(), self._rng.uniform(-1.0, 1.0), self._rng.randint(0, 2 ** 31)
+
+    def _complete(self, messages, model, response_format, stream=False, **kwargs):
+        prompt = messages[-1]["content"]
+        error_roll, jitter_roll, seed = self._draw()
+
+        base = MODEL_LATENCY.get(model, DEFAULT_LATENCY)
+        delay = max(0.0, base * (1 + self.jitter * jitter_roll)) * self.latency_scale
+        if error_roll < self.error_rate:
+            time.sleep(delay * 0.1)
+            with self._lock:
+                self.rate_limited += 1
+            response = httpx.Response(429, request=httpx.Request("POST", GROQ_URL),
+                                      headers={"retry-after": f"{self.retry_after:g}"})
+            raise RateLimitError(f"Rate limit reached for model `{model}`", response=response, body=None)
+        if not stream:
+            time.sleep(delay)
+
+        rng = random.Random(seed)
+        node_count = self.flow_nodes or min(60, 6 + len(prompt) // 400)
+        if response_format and '"introduction"' in prompt:
+            # single-call structured mode: every section plus the flow graph
+            text = SECTION_TEXT.format(title="sample")
+            content = json.dumps({"introduction": text, "audience": text, "purpose": text,
+                                  "scope": text, "flow": make_flow_graph(node_count, rng)})
+        elif response_format and response_format.get("type") == "json_object":
+            content = json.dumps(make_flow_graph(node_count, rng))
+        elif "Summarize" in prompt or "Merge them" in prompt:
+            content = "\n".join(f"Step {i}: key activity {rng.randint(1, 999)} with its system and output."
+                                for i in range(1, 12))
+        else:
+            content = SECTION_TEXT.format(title="sample")
+
+        usage = _usage(prompt, content)
+        with self._lock:
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+        if stream:
+            return self._stream(content, usage, delay, model, seed)
+        message = types.SimpleNamespace(role="assistant", content=content)
+        choice = types.SimpleNamespace(index=0, message=message, finish_reason="stop")
+        return types.SimpleNamespace(id=f"fake-{seed}", model=model, choices=[choice], usage=usage)
+
+    def _stream(self, content, usage, delay, model, seed):
+        # like Groq: content deltas, then a final chunk carrying usage in x_groq
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        time.sleep(delay * FIRST_TOKEN_SHARE)
+        for piece in pieces:
+            time.sleep(delay * (1 - FIRST_TOKEN_SHARE) / max(1, len(pieces)))
+            delta = types.SimpleNamespace(role="assistant", content=piece)
+            choice = types.SimpleNamespace(index=0, delta=delta, finish_reason=None)
+            yield types.SimpleNamespace(id=f"fake-{seed}", model=model, choices=[choice], x_groq=None)
+        yield types.SimpleNamespace(id=f"fake-{seed}", model=model, choices=[],
+                                    x_groq=types.SimpleNamespace(usage=usage))
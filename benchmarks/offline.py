@@ -0,0 +1,66 @@
+"""Shared setup for the offline benchmarks: throwaway caches and RSS sampling."""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+SAMPLE_SECONDS = 0.25
+
+
+def use_throwaway_caches(prefix):
+    # call before importing pipeline; settings already in the environment win
+    cache_dir = tempfile.mkdtemp(prefix=prefix)
+    atexit.register(shutil.rmtree, cache_dir, ignore_errors=True)
+    os.environ.setdefault("PDD_CACHE_PATH", os.path.join(cache_dir, "llm_cache.sqlite3"))
+    os.environ.setdefault("PDD_SCHEDULER_PATH", os.path.join(cache_dir, "scheduler.sqlite3"))
+    os.environ.setdefault("PDD_FLOWCHART_CACHE_DIR", "")
+    os.environ.setdefault("PDD_SKELETON_CACHE_DIR", os.path.join(cache_dir, "skeletons"))
+    # the fake client has no quota; keep the scheduler from throttling it
+    os.environ.setdefault("PDD_RATE_LIMITS", '{"*": {"rpm": 0, "tpm": 0}, '
+                          '"llama-3.1-8b-instant": {"rpm": 0, "tpm": 0}, '
+                          '"llama-3.3-70b-versatile": {"rpm": 0, "tpm": 0}}')
+    os.environ.setdefault("PDD_BACKOFF_BASE_SECONDS", "0.05")
+    return cache_dir
+
+
+def lifetime_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:   # Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, AttributeError, ValueError):   # not Linux: lifetime peak instead
+        return lifetime_peak_rss_mb()
+
+
+class Sampler:
+    # highest RSS seen while running
+
+    def __init__(self):
+        self.peak_mb = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(SAMPLE_SECONDS):
+            self.peak_mb = max(self.peak_mb, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, rss_mb())
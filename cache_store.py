@@ -0,0 +1,73 @@
+"""In-memory LRU with an optional directory behind it, for results that are costly to build.
+
+Used for rendered flowcharts, front matter skeletons, prepared logos and
+banners, and extracted input text. Values kept on disk must be bytes and
+keys file-name safe strings (hex digests); the directory is shared between
+processes and written atomically, so a reader never sees half a file.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class CacheStore:
+
+    def __init__(self, size, disk_dir="", suffix=""):
+        # disk_dir "" keeps the cache in memory only
+        self.size = size
+        self.disk_dir = disk_dir
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}{self.suffix}")
+
+    def get(self, key):
+        # None on a miss
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                return value
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                value = f.read()
+        except OSError:
+            return None
+        if not value:
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            pass
+
+    def get_or_build(self, key, build):
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def _remember(self, key, value):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
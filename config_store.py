@@ -0,0 +1,86 @@
+"""Process-wide cache of the parsed Input/Config.xlsx lookup tables."""
+
+import hashlib
+import os
+import pickle
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE_DIR, "Input", "Config.xlsx")
+# compiled copy of the lookup dicts, so a cold process can skip openpyxl
+COMPILED_CONFIG_PATH = os.getenv("PDD_COMPILED_CONFIG_PATH", os.path.join(".cache", "config.pickle"))
+CONFIG_SHEETS = ["BRANDING", "CONTACTS", "COMPANY", "CLIENT"]
+
+_lock = threading.Lock()
+_loaded = {}   # config path -> (signature, sha256, dicts)
+
+
+def _signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def parse_workbook(path):
+    # pandas is only needed when the compiled copy is missing or stale
+    import pandas as pd
+
+    # one workbook open for all four sheets
+    sheets = pd.read_excel(path, sheet_name=CONFIG_SHEETS)
+    branding, contacts = sheets["BRANDING"], sheets["CONTACTS"]
+    company, clients = sheets["COMPANY"], sheets["CLIENT"]
+    branding_dict = branding.set_index("Client Code").to_dict("index")
+    contacts_dict = contacts.set_index("Role").to_dict("index")
+    company_dict = dict(zip(company["Company Fields"], company["Company Values"]))
+    clients_dict = clients.set_index("Client Code").to_dict("index")
+    return branding_dict, contacts_dict, company_dict, clients_dict
+
+
+def _read_compiled(path, sha256):
+    try:
+        with open(COMPILED_CONFIG_PATH, "rb") as f:
+            compiled = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if compiled.get("source") == os.path.abspath(path) and compiled.get("sha256") == sha256:
+        return compiled["config"]
+    return None
+
+
+def _write_compiled(path, sha256, config):
+    folder = os.path.dirname(COMPILED_CONFIG_PATH)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{COMPILED_CONFIG_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"source": os.path.abspath(path), "sha256": sha256, "config": config}, f)
+        os.replace(tmp_path, COMPILED_CONFIG_PATH)
+    except OSError:
+        # the compiled copy is only an optimisation
+        pass
+
+
+def load_config(path=CONFIG_PATH):
+    # returned dicts are shared by every session - treat them as read-only
+    signature = _signature(path)
+    with _lock:
+        cached = _loaded.get(path)
+        if cached and cached[0] == signature:
+            return cached[2]
+
+        # mtime changed (or first load): only re-parse if the content did too
+        sha256 = _file_hash(path)
+        if cached and cached[1] == sha256:
+            config = cached[2]
+        else:
+            config = _read_compiled(path, sha256)
+            if config is None:
+                config = parse_workbook(path)
+                _write_compiled(path, sha256, config)
+        _loaded[path] = (signature, sha256, config)
+        return config
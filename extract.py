@@ -0,0 +1,156 @@
+"""Streaming text extraction for uploaded .docx / .txt process files.
+
+.docx files are read straight from word/document.xml with lxml's iterparse
+(python-docx already depends on lxml), so only the paragraph or table being
+read is held in memory; table rows come out as
+"cell | cell | cell" lines (doc.paragraphs used to skip tables entirely).
+Reading stops at a character budget, and results are memoized by file hash
+so Streamlit reruns don't parse the same upload again.
+"""
+
+import hashlib
+import io
+import os
+import zipfile
+
+from lxml.etree import iterparse
+
+from cache_store import CacheStore
+from settings import MAX_INPUT_CHARS
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+TEXT_TAGS = (W + "t", W + "tab", W + "br", W + "cr")
+BLOCK_TAGS = (W + "body", W + "p", W + "tr", W + "tc")
+EXTRACT_CACHE_SIZE = int(os.getenv("PDD_EXTRACT_CACHE_SIZE", "16"))
+HASH_BLOCK_BYTES = 1024 * 1024
+
+# (text, truncated) by file digest; kept in memory only
+_cache = CacheStore(EXTRACT_CACHE_SIZE)
+
+
+def _paragraph_text(p):
+    # w:t only - deleted revisions live in w:delText and are left out
+    parts = []
+    for el in p.iter(*TEXT_TAGS):
+        if el.tag == W + "t":
+            parts.append(el.text or "")
+        else:
+            parts.append("\t" if el.tag == W + "tab" else "\n")
+    return "".join(parts)
+
+
+def iter_docx_lines(file):
+    # one line per body paragraph or table row, in document order
+    with zipfile.ZipFile(file) as archive, archive.open("word/document.xml") as xml:
+        body = None
+        p_depth = 0     # text boxes nest paragraphs inside paragraphs
+        rows = []       # open table rows -> cell texts
+        cells = []      # open table cells -> paragraph texts
+        for event, el in iterparse(xml, events=("start", "end"), tag=BLOCK_TAGS):
+            tag = el.tag
+            if event == "start":
+                if tag == W + "p":
+                    p_depth += 1
+                elif tag == W + "tr":
+                    rows.append([])
+                elif tag == W + "tc":
+                    cells.append([])
+                elif tag == W + "body":
+                    body = el
+                continue
+
+            if tag == W + "p":
+                p_depth -= 1
+                if p_depth:
+                    continue
+                line = _paragraph_text(el)
+                el.clear()
+                if cells:
+                    cells[-1].append(line)
+                    continue
+            elif tag == W + "tc":
+                text = " ".join(t.strip() for t in cells.pop() if t.strip())
+                rows[-1].append(text)
+                el.clear()
+                continue
+            elif tag == W + "tr":
+                line = " | ".join(rows.pop())
+                el.clear()
+                if cells:   # nested table
+                    cells[-1].append(line)
+                    continue
+            else:
+                continue
+
+            # back at body level: drop everything read so far
+            if body is not None:
+                del body[:]
+            yield line
+
+
+def iter_text_lines(file):
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, encoding="utf-8-sig", errors="replace") as f:
+            for line in f:
+                yield line.rstrip("\n")
+        return
+    stream = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace")
+    try:
+        for line in stream:
+            yield line.rstrip("\n")
+    finally:
+        # leave the caller's file open
+        stream.detach()
+
+
+def file_digest(file):
+    h = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+                h.update(block)
+        return h.hexdigest()
+    file.seek(0)
+    for block in iter(lambda: file.read(HASH_BLOCK_BYTES), b""):
+        h.update(block)
+    file.seek(0)
+    return h.hexdigest()
+
+
+def read_limited(lines, max_chars):
+    # (text, truncated); text is never longer than max_chars
+    parts, size = [], 0
+    for line in lines:
+        room = max_chars - size - (1 if parts else 0)
+        if len(line) > room:
+            if room > 0:
+                parts.append(line[:room])
+            return "\n".join(parts), True
+        parts.append(line)
+        size += len(line) + (1 if len(parts) > 1 else 0)
+    return "\n".join(parts), False
+
+
+def extract_text(file, name=None, max_chars=MAX_INPUT_CHARS, memoize=True):
+    # file: path or binary file object (e.g. a Streamlit UploadedFile);
+    # max_chars=None reads everything. Returns (text, truncated).
+    name = name or getattr(file, "name", None) or str(file)
+    is_docx = name.lower().endswith(".docx")
+    if memoize:
+        key = (file_digest(file), is_docx, max_chars)
+        return _cache.get_or_build(key, lambda: _extract(file, is_docx, max_chars))
+    return _extract(file, is_docx, max_chars)
+
+
+def _extract(file, is_docx, max_chars):
+    lines = iter_docx_lines(file) if is_docx else iter_text_lines(file)
+    try:
+        if max_chars is None:
+            result = "\n".join(lines), False
+        else:
+            result = read_limited(lines, max_chars)
+    finally:
+        lines.close()
+        if not isinstance(file, (str, os.PathLike)):
+            file.seek(0)
+    return result
@@ -0,0 +1,188 @@
+"""Flowchart rendering from the LLM flow JSON, in memory and cached by graph hash.
+
+The layout and DPI follow the size of the flow (FLOW_LAYOUTS): small, sparse
+flows keep the square 7x7 layout, bigger or densely connected ones keep their
+aspect ratio and are shown wider. Flows with more than PDD_FLOW_PART_NODES
+nodes are split into parts (split_flow), one page each, joined by off-page
+connector nodes.
+
+    PDD_FLOWCHART_FORMAT   "png" (default) or "svg": vector image in the DOCX,
+                           with a low-DPI PNG for readers without SVG support
+    PDD_FLOW_PART_NODES    most nodes drawn on one page (default 25)
+"""
+
+import hashlib
+import json
+import os
+import struct
+
+from graphviz import Digraph
+
+from cache_store import CacheStore
+
+# STYLE (part of the cache key, so changing any of it re-renders)
+GRAPH_ATTRS = {"rankdir": "TB", "nodesep": "0.5", "ranksep": "0.4", "splines": "polyline"}
+NODE_ATTRS = {"fontname": "Arial", "fontsize": "10", "shape": "rect",
+              "style": "filled, rounded", "color": "#000000", "fillcolor": "#E3F2FD",
+              "width": "2.0", "height": "0.6", "penwidth": "1.2"}
+TERMINAL_NODE_ATTRS = {"shape": "capsule", "fillcolor": "#4285F4", "fontcolor": "white",
+                       "color": "#000000", "style": "filled"}
+DECISION_NODE_ATTRS = {"shape": "diamond", "fillcolor": "#4285F4", "fontcolor": "white",
+                       "color": "#000000", "style": "filled", "width": "1.4", "height": "0.9"}
+CONNECTOR_NODE_ATTRS = {"shape": "invhouse", "fillcolor": "#FFF3E0", "color": "#000000",
+                        "style": "filled", "fontsize": "9", "width": "1.2", "height": "0.5"}
+LABELED_EDGE_ATTRS = {"labelangle": "-45", "labeldistance": "2.5",
+                      "fontname": "Arial", "fontsize": "9", "fontcolor": "#2c3e50"}
+PLAIN_EDGE_ATTRS = {"penwidth": "1.0"}
+
+# LAYOUT: (up to this many nodes, up to this many edges, graph attrs, box on
+# the page in inches). Decisions and loop-backs add edges that cross, so a few
+# nodes with many edges need the bigger box too. The image is drawn up to 7
+# inches wide and shown in the box, so the dpi gives roughly 300 dpi in print
+# without rasterizing more than that.
+FLOW_LAYOUTS = [
+    (12, 15, {"size": "7,7!", "ratio": "fill", "dpi": "215"}, (5.0, 5.0)),
+    (None, None, {"size": "7,9!", "nodesep": "0.3", "ranksep": "0.3", "dpi": "200"}, (6.5, 8.4)),
+]
+FLOW_PART_NODES = int(os.getenv("PDD_FLOW_PART_NODES", "25"))
+FLOWCHART_FORMAT = os.getenv("PDD_FLOWCHART_FORMAT", "png")
+FALLBACK_DPI = 96       # PNG shown by readers that can't draw the SVG
+
+# CACHE (in-memory LRU, plus an optional directory shared between processes)
+FLOWCHART_CACHE_SIZE = int(os.getenv("PDD_FLOWCHART_CACHE_SIZE", "64"))
+FLOWCHART_CACHE_DIR = os.getenv("PDD_FLOWCHART_CACHE_DIR", os.path.join(".cache", "flowcharts"))
+
+_cache = CacheStore(FLOWCHART_CACHE_SIZE, FLOWCHART_CACHE_DIR)
+
+
+def flowchart_layout(data):
+    # (graph attrs, (box width, box height) in inches) for this flow's size
+    nodes, edges = len(data.get("nodes", [])), len(data.get("edges", []))
+    for max_nodes, max_edges, attrs, box in FLOW_LAYOUTS:
+        if (max_nodes is None or nodes <= max_nodes) and (max_edges is None or edges <= max_edges):
+            return dict(GRAPH_ATTRS, **attrs), box
+
+
+def graph_attrs(data, fmt="png", dpi=None):
+    attrs, _ = flowchart_layout(data)
+    if fmt == "svg":
+        attrs.pop("dpi", None)
+    elif dpi:
+        attrs["dpi"] = str(dpi)
+    return attrs
+
+
+def _flow_order(data):
+    # depth-first from the start node(s), so each decision branch stays together
+    nodes = data.get("nodes", [])
+    children = {}
+    targets = set()
+    for edge in data.get("edges", []):
+        children.setdefault(edge.get("from"), []).append(edge.get("to"))
+        targets.add(edge.get("to"))
+    roots = [n["id"] for n in nodes if n.get("type", "").lower() == "start"]
+    roots += [n["id"] for n in nodes if n["id"] not in targets]
+    roots += [n["id"] for n in nodes]   # whatever is only reachable through a cycle
+    by_id = {n["id"]: n for n in nodes}
+    order, seen = [], set()
+    for root in roots:
+        stack = [root]
+        while stack:
+            node_id = stack.pop()
+            if node_id in seen or node_id not in by_id:
+                continue
+            seen.add(node_id)
+            order.append(by_id[node_id])
+            stack.extend(reversed(children.get(node_id, [])))
+    return order
+
+
+def split_flow(data, max_nodes=FLOW_PART_NODES):
+    # list of flows small enough for one page each; an edge between two parts
+    # ends in an off-page connector ("To part 2" / "From part 1") on both sides
+    if len(data.get("nodes", [])) <= max_nodes:
+        return [data]
+    parts, current = [], []
+    for node in _flow_order(data):
+        # cut at the limit, or earlier at a decision once the part is half full
+        is_decision = node.get("type", "").lower() == "decision"
+        if current and (len(current) >= max_nodes or (is_decision and len(current) >= max_nodes // 2)):
+            parts.append(current)
+            current = []
+        current.append(node)
+    parts.append(current)
+
+    part_of = {node["id"]: i for i, part in enumerate(parts) for node in part}
+    flows = []
+    for i, part in enumerate(parts):
+        nodes, edges, connectors = list(part), [], {}
+        for edge in data.get("edges", []):
+            src, dst = part_of.get(edge.get("from")), part_of.get(edge.get("to"))
+            if src is None or dst is None or i not in (src, dst):
+                continue
+            if src == dst:
+                edges.append(edge)
+            elif src == i:
+                node_id = f"__to_part_{dst + 1}"
+                connectors[node_id] = f"To part {dst + 1}"
+                edges.append(dict(edge, to=node_id))
+            else:
+                node_id = f"__from_part_{src + 1}"
+                connectors[node_id] = f"From part {src + 1}"
+                edges.append(dict(edge, **{"from": node_id}))
+        nodes += [{"id": node_id, "label": label, "type": "connector"} for node_id, label in connectors.items()]
+        flows.append({"nodes": nodes, "edges": edges})
+    return flows
+
+
+def png_size(image):
+    # (width, height) in pixels from the PNG header
+    return struct.unpack(">II", image[16:24])
+
+
+def build_flowchart(data, fmt="png", dpi=None):
+    dot = Digraph(comment='Process Flow', engine='dot')
+    dot.attr(**graph_attrs(data, fmt, dpi))
+    dot.attr('node', **NODE_ATTRS)
+
+    for node in data.get('nodes', []):
+        label = node.get('label', '')
+        if len(label) > 15:
+            label = label.replace(' ', '\n', 1)
+
+        node_type = node.get('type', '').lower()
+        if node_type in ['start', 'end']:
+            dot.node(node['id'], label, **TERMINAL_NODE_ATTRS)
+        elif node_type == 'decision':
+            dot.node(node['id'], label, **DECISION_NODE_ATTRS)
+        elif node_type == 'connector':
+            dot.node(node['id'], label, **CONNECTOR_NODE_ATTRS)
+        else:
+            dot.node(node['id'], label)
+    for edge in data.get('edges', []):
+        label_text = edge.get('label', '').strip()
+
+        if label_text:
+            dot.edge(edge['from'], edge['to'], taillabel=f" {label_text} ", **LABELED_EDGE_ATTRS)
+        else:
+            dot.edge(edge['from'], edge['to'], **PLAIN_EDGE_ATTRS)
+    return dot
+
+
+def flowchart_key(data, fmt="png", dpi=None):
+    payload = {
+        "nodes": data.get("nodes", []),
+        "edges": data.get("edges", []),
+        "style": [graph_attrs(data, fmt, dpi), NODE_ATTRS, TERMINAL_NODE_ATTRS, DECISION_NODE_ATTRS,
+                  CONNECTOR_NODE_ATTRS, LABELED_EDGE_ATTRS, PLAIN_EDGE_ATTRS],
+        "format": fmt,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def render_flowchart(data, fmt="png", dpi=None):
+    # returns the rendered image bytes; identical flows are laid out only once.
+    # dpi overrides the layout's (PNG only)
+    key = flowchart_key(data, fmt, dpi)
+    return _cache.get_or_build(f"{key}.{fmt}", lambda: build_flowchart(data, fmt, dpi).pipe(format=fmt))
@@ -0,0 +1,211 @@
+"""Checks and repairs the flow JSON the LLM returns before it is drawn.
+
+normalize_flow fixes what can be fixed locally: ids become unique strings
+graphviz accepts, node types are mapped onto action/decision/start/end,
+edges are matched to nodes by id (or by label) and the rest dropped, a flow
+without any edges is chained in the order its steps were listed, and
+start/end nodes are inferred from the shape of the graph. What it cannot
+fix (edges to steps that are missing, decisions with a single branch, steps
+nothing leads to) comes back as a list of problems, so only that part of
+the flow is asked for again (pipeline.repair_flow).
+"""
+
+import json
+import re
+
+NODE_TYPES = ["action", "decision", "start", "end"]
+TYPE_ALIASES = {
+    "process": "action", "task": "action", "step": "action", "activity": "action", "operation": "action",
+    "condition": "decision", "gateway": "decision", "question": "decision", "branch": "decision",
+    "begin": "start", "entry": "start",
+    "stop": "end", "finish": "end", "exit": "end",
+}
+START_WORDS = ("start", "begin")
+MAX_PROBLEMS = 20       # listed in the repair prompt
+
+_TRAILING_COMMA = re.compile(r",\s*([\]}])")
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+
+def load_flow_json(text):
+    # json.loads, but also takes the object out of code fences or prose
+    # around it and drops trailing commas
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    text = _FENCE.sub("", text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("no JSON object in the flow response")
+    return json.loads(_TRAILING_COMMA.sub(r"\1", text[start:end + 1]))
+
+
+def _unwrap(data):
+    # {"flow": {"nodes": ...}} and similar single wrappers
+    if isinstance(data, dict) and "nodes" not in data and "steps" not in data:
+        inner = [value for value in data.values() if isinstance(value, dict)]
+        if len(inner) == 1:
+            return inner[0]
+    return data
+
+
+def _raw_parts(data):
+    data = _unwrap(data)
+    if not isinstance(data, dict):
+        return [], []
+    nodes = data.get("nodes", data.get("steps"))
+    edges = data.get("edges", data.get("links", data.get("connections")))
+    return (nodes if isinstance(nodes, list) else []), (edges if isinstance(edges, list) else [])
+
+
+def clean_id(value):
+    # str id usable in graphviz, or None; ":" would be read as a node port
+    # and "__" starts the connector ids split_flow adds
+    if value is None or isinstance(value, (dict, list, bool)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    node_id = str(value).strip().replace(":", "_")
+    if node_id.startswith("__"):
+        node_id = "n" + node_id
+    return node_id or None
+
+
+def _node_type(value, label):
+    node_type = str(value or "").strip().lower()
+    node_type = TYPE_ALIASES.get(node_type, node_type)
+    if node_type not in NODE_TYPES:
+        # includes the "action/decision" copied from the prompt template
+        node_type = "decision" if label.endswith("?") else "action"
+    return node_type
+
+
+def _describe(node):
+    return f"step {node['id']} \"{node['label']}\""
+
+
+def normalize_flow(data):
+    # -> (flow, problems); flow is None when there are no steps at all
+    raw_nodes, raw_edges = _raw_parts(data)
+
+    nodes, by_id = [], {}
+    for index, raw in enumerate(raw_nodes, 1):
+        if isinstance(raw, str):
+            raw = {"label": raw}
+        if not isinstance(raw, dict):
+            continue
+        label = raw.get("label", raw.get("name", raw.get("text")))
+        label = "" if label is None else str(label).strip()
+        node_id = clean_id(raw.get("id")) or f"n{index}"
+        if node_id in by_id:
+            if by_id[node_id]["label"] == label:
+                continue        # the same step listed twice
+            # edges can't tell the two apart; they keep going to the first
+            base, suffix = node_id, 2
+            while f"{base}_{suffix}" in by_id:
+                suffix += 1
+            node_id = f"{base}_{suffix}"
+        node = {"id": node_id, "label": label or node_id, "type": _node_type(raw.get("type"), label)}
+        nodes.append(node)
+        by_id[node_id] = node
+    if not nodes:
+        return None, ["the flow has no steps"]
+
+    by_label = {}
+    for node in nodes:
+        by_label.setdefault(node["label"].lower(), node["id"])
+
+    def resolve(value):
+        node_id = clean_id(value)
+        if node_id in by_id:
+            return node_id
+        return by_label.get(str(value).strip().lower()) if value is not None else None
+
+    problems, edges, seen = [], [], set()
+    for raw in raw_edges:
+        if not isinstance(raw, dict):
+            continue
+        src_raw, dst_raw = raw.get("from", raw.get("source")), raw.get("to", raw.get("target"))
+        src, dst = resolve(src_raw), resolve(dst_raw)
+        label = raw.get("label")
+        label = "" if label is None else str(label).strip()
+        if src is None or dst is None:
+            if src is not None:
+                problems.append(f"{_describe(by_id[src])} leads to step \"{dst_raw}\", which is not in the list")
+            elif dst is not None:
+                problems.append(f"{_describe(by_id[dst])} is reached from step \"{src_raw}\", "
+                                f"which is not in the list")
+            continue
+        if (src, dst, label) not in seen:
+            seen.add((src, dst, label))
+            edges.append({"from": src, "to": dst, "label": label})
+
+    if not edges and len(nodes) > 1:
+        # steps come back in order; read them as a sequence
+        edges = [{"from": a["id"], "to": b["id"], "label": ""} for a, b in zip(nodes, nodes[1:])]
+
+    incoming = {node["id"]: 0 for node in nodes}
+    outgoing = {node["id"]: 0 for node in nodes}
+    children = {}
+    for edge in edges:
+        outgoing[edge["from"]] += 1
+        incoming[edge["to"]] += 1
+        children.setdefault(edge["from"], []).append(edge["to"])
+
+    # an "end" that leads on is a plain step
+    for node in nodes:
+        if node["type"] == "end" and outgoing[node["id"]]:
+            node["type"] = "action"
+    starts = [node for node in nodes if node["type"] == "start"]
+    if not starts:
+        roots = [node for node in nodes if not incoming[node["id"]] and outgoing[node["id"]]]
+        named = [node for node in roots if node["label"].lower().startswith(START_WORDS)]
+        start = (named or roots or nodes)[0]
+        if start["type"] == "action":
+            start["type"] = "start"
+        starts = [start]
+    # every dead end is where the process finishes
+    for node in nodes:
+        if node["type"] == "action" and incoming[node["id"]] and not outgoing[node["id"]]:
+            node["type"] = "end"
+
+    if len(nodes) < 2:
+        problems.append("the flow has only one step")
+    for node in nodes:
+        if node["type"] == "decision" and outgoing[node["id"]] < 2:
+            problems.append(f"decision {_describe(node)} has {outgoing[node['id']]} outgoing edge(s); "
+                            f"it needs one per outcome")
+        elif len(nodes) > 1 and not incoming[node["id"]] and not outgoing[node["id"]]:
+            problems.append(f"{_describe(node)} is not connected to any other step")
+
+    # other entry points nothing leads to (loops back to them are fine)
+    reached, stack = set(), [node["id"] for node in starts]
+    while stack:
+        node_id = stack.pop()
+        if node_id not in reached:
+            reached.add(node_id)
+            stack.extend(children.get(node_id, []))
+    for node in nodes:
+        if node["id"] not in reached and not incoming[node["id"]] and outgoing[node["id"]]:
+            problems.append(f"nothing leads to {_describe(node)}")
+
+    return {"nodes": nodes, "edges": edges}, problems[:MAX_PROBLEMS]
+
+
+def merge_flow_patch(flow, patch):
+    # patch: {"nodes": [...], "edges": [...]} from the repair prompt; nodes
+    # replace those with the same id, the rest and all edges are added
+    patch_nodes, patch_edges = _raw_parts(patch)
+    nodes = {node["id"]: dict(node) for node in flow["nodes"]}
+    added = []
+    for raw in patch_nodes:
+        if not isinstance(raw, dict):
+            continue
+        node_id = clean_id(raw.get("id"))
+        if node_id in nodes:
+            nodes[node_id].update({key: raw[key] for key in ("label", "type") if raw.get(key)})
+        else:
+            added.append(raw)
+    edges = list(flow["edges"]) + [edge for edge in patch_edges if isinstance(edge, dict)]
+    return {"nodes": list(nodes.values()) + added, "edges": edges}
@@ -0,0 +1,188 @@
+"""Per-session incremental regeneration.
+
+Every stage result is kept together with a hash of the inputs it was built from:
+
+    source chunks -> chunk summaries -> short_context -> section texts / flow JSON -> DOCX
+                                                         flow JSON -> PNG (flowchart.py cache)
+
+On the next Generate only the stages whose input hash changed are recomputed.
+Editing one paragraph re-summarizes the chunk it sits in; sections and the
+flow are re-asked only if the summary (and so their prompt) changed; a new
+title only re-asks the sections whose prompt mentions it.
+
+    session = IncrementalSession()            # one per Streamlit session
+    content = session.generate_llm_content(client, text, title)
+    docx_bytes = session.build_docx(meta, content, contacts, company)
+    session.last_run                          # {"summary": "reused", ...}
+"""
+
+import hashlib
+import json
+from datetime import date
+
+from pipeline import (
+    GENERATION_MODE,
+    PDD_SECTIONS,
+    SUMMARY_CHUNK_TOKENS,
+    build_document_bytes,
+    build_section_prompt,
+    chunk_hash,
+    flow_prompt,
+    gather,
+    generate_ai_content,
+    generate_structured_content,
+    get_short_context,
+    get_smart_flow_data,
+    llm_pool,
+    split_into_chunks,
+    structured_prompt,
+    token_budget,
+)
+from tracing import span, submit
+
+REUSED = "reused"
+RECOMPUTED = "recomputed"
+
+
+def digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def usable_text(text):
+    # error placeholders must not be remembered as the answer for these inputs
+    # ("[AI Error" text only comes from versions that wrote it into the document)
+    return isinstance(text, str) and not text.startswith(("[AI Error", "[API Key Missing]"))
+
+
+class IncrementalSession:
+
+    def __init__(self):
+        self.nodes = {}             # stage -> (input hash, value)
+        self.chunk_summaries = {}   # chunk hash -> summary
+        self.last_run = {}          # stage -> REUSED / RECOMPUTED
+
+    def reset(self):
+        self.nodes.clear()
+        self.chunk_summaries.clear()
+
+    def is_fresh(self, name, key):
+        node = self.nodes.get(name)
+        return node is not None and node[0] == key
+
+    def stage(self, name, key, compute, keep=None):
+        if self.is_fresh(name, key):
+            self.last_run[name] = REUSED
+            with span(name, reused=True):
+                return self.nodes[name][1]
+        value = compute()
+        self.last_run[name] = RECOMPUTED
+        if keep is None or keep(value):
+            self.nodes[name] = (key, value)
+        else:
+            self.nodes.pop(name, None)
+        return value
+
+    def summary_key(self, client, process_context):
+        chunks = split_into_chunks(process_context, SUMMARY_CHUNK_TOKENS)
+        chunk_keys = [chunk_hash(chunk) for chunk in chunks]
+        # without a client the "summary" is the raw text, so whitespace counts
+        key = digest(chunk_keys) if client else digest(process_context)
+        return key, chunk_keys
+
+    def summary(self, client, process_context, use_cache=True, should_cancel=None):
+        key, chunk_keys = self.summary_key(client, process_context)
+        short_context = self.stage(
+            "summary", key,
+            lambda: get_short_context(client, process_context, use_cache, chunk_memo=self.chunk_summaries,
+                                      should_cancel=should_cancel),
+            keep=usable_text,
+        )
+        # only remember chunks that are still part of the input
+        current = set(chunk_keys)
+        self.chunk_summaries = {k: v for k, v in self.chunk_summaries.items() if k in current}
+        return short_context
+
+    def adopt(self, client, process_context, match):
+        # take a near-duplicate's results (similarity.py) as this input's:
+        # its summary stands in for ours, so the sections and flow built from
+        # it are reused too, except those whose prompt mentions a new title
+        short_context, title = match["short_context"], match["title"]
+        self.nodes["summary"] = (self.summary_key(client, process_context)[0], short_context)
+        for name, text in match["sections"].items():
+            self.nodes[f"section {name}"] = (digest(build_section_prompt(name, short_context, title)), text)
+        self.nodes["structured"] = (digest(structured_prompt(short_context, title)),
+                                    (match["sections"], match["flow_data"]))
+        if match["flow_data"].get("edges"):
+            self.nodes["flow"] = (digest(flow_prompt(short_context)), match["flow_data"])
+        self.seed_chunks(match)
+
+    def seed_chunks(self, match):
+        # diff-based refresh: chunks the near-duplicate shares with this input
+        # keep their summaries, only the changed ones are sent again
+        self.chunk_summaries.update(match["chunk_summaries"])
+
+    def per_section_content(self, client, short_context, context_title, use_cache=True, on_delta=None,
+                            should_cancel=None):
+        keys = {name: digest(build_section_prompt(name, short_context, context_title)) for name in PDD_SECTIONS}
+        flow_key = digest(flow_prompt(short_context))
+        futures = {}
+        with llm_pool() as pool:
+            for name in PDD_SECTIONS:
+                if not self.is_fresh(f"section {name}", keys[name]):
+                    futures[name] = submit(pool, generate_ai_content, client, name, short_context,
+                                           context_title, use_cache, on_delta, should_cancel)
+            if not self.is_fresh("flow", flow_key):
+                futures["FLOW"] = submit(pool, get_smart_flow_data, client, short_context, use_cache,
+                                         should_cancel)
+            results = gather(futures, should_cancel)
+
+        section_content = {
+            name: self.stage(f"section {name}", keys[name], lambda name=name: results[name], keep=usable_text)
+            for name in PDD_SECTIONS
+        }
+        # the single "Start" node fallback has no edges; ask again next time
+        flow_data = self.stage("flow", flow_key, lambda: results["FLOW"],
+                               keep=lambda flow: bool(flow.get("edges")))
+        return section_content, flow_data
+
+    def structured_content(self, client, short_context, context_title, use_cache=True, on_delta=None,
+                           should_cancel=None):
+        key = digest(structured_prompt(short_context, context_title))
+        return self.stage(
+            "structured", key,
+            lambda: generate_structured_content(client, short_context, context_title, use_cache=use_cache,
+                                                on_delta=on_delta, should_cancel=should_cancel),
+            keep=lambda result: all(usable_text(text) for text in result[0].values()),
+        )
+
+    def generate_llm_content(self, client, process_context, dynamic_title, use_cache=True, mode=None,
+                             on_delta=None, should_cancel=None):
+        # same arguments and result shape as pipeline.generate_llm_content
+        self.last_run = {}
+        with token_budget():
+            short_context = self.summary(client, process_context, use_cache, should_cancel)
+            if (mode or GENERATION_MODE) == "structured":
+                section_content, flow_data = self.structured_content(client, short_context, dynamic_title,
+                                                                     use_cache, on_delta, should_cancel)
+            else:
+                section_content, flow_data = self.per_section_content(client, short_context, dynamic_title,
+                                                                      use_cache, on_delta, should_cancel)
+        return {"short_context": short_context, "sections": section_content, "flow_data": flow_data}
+
+    def build_docx(self, meta, content, contacts, company, today=None):
+        # the flowchart PNG is cached by flow hash inside render_flowchart
+        today = today or date.today().strftime("%m/%d/%Y")
+        key = digest(meta, content["sections"], content["flow_data"], contacts, company, today)
+        return self.stage(
+            "docx", key,
+            lambda: build_document_bytes(meta, content["sections"], content["flow_data"], contacts, company, today),
+        )
+
+    def summary_line(self):
+        reused = [name for name, state in self.last_run.items() if state == REUSED]
+        recomputed = [name for name, state in self.last_run.items() if state == RECOMPUTED]
+        return f"Reused: {', '.join(reused) or 'nothing'} | Regenerated: {', '.join(recomputed) or 'nothing'}"
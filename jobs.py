@@ -0,0 +1,183 @@
+"""Background generation jobs, shared by every session of the Streamlit server.
+
+Generate only submits a job to a shared pool of worker threads, so the work
+survives widget reruns and page refreshes, and several users' documents are
+generated side by side (graphviz renders in its own `dot` process). The UI
+polls Job.snapshot() for the stage and the streamed section text, and takes
+the document bytes from the job once it is done.
+
+    PDD_JOB_WORKERS             concurrent jobs (default 4)
+    PDD_JOB_RETENTION_MINUTES   how long finished jobs stay downloadable (default 60)
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from artifacts import get_artifact_store
+from incremental import usable_text
+from pipeline import GenerationCancelled, check_cancelled, document_filename
+from tracing import span, start_trace
+
+JOB_WORKERS = int(os.getenv("PDD_JOB_WORKERS", "4"))
+JOB_RETENTION_SECONDS = float(os.getenv("PDD_JOB_RETENTION_MINUTES", "60")) * 60
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# stage names in the order a job moves through them
+STAGES = ["queued", "summary", "sections", "document", "done"]
+
+
+class Job:
+
+    def __init__(self, session_id, title):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.title = title
+        self.status = QUEUED
+        self.stage = "queued"
+        self.sections = {}      # section -> text streamed so far
+        self.error = None
+        self.data = None        # DOCX bytes once DONE
+        self.fname = document_filename(title)
+        self.last_run = ""
+        self.trace = None
+        self.created = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+
+    def set_sections(self, sections):
+        with self._lock:
+            self.sections = dict(sections)
+
+    def on_delta(self, section, text):
+        # called from the pipeline's worker threads while sections stream in
+        if self.cancel_requested:
+            raise GenerationCancelled()
+        with self._lock:
+            self.stage = "sections"
+            self.sections[section] = text
+
+    def snapshot(self):
+        with self._lock:
+            return {"status": self.status, "stage": self.stage, "sections": dict(self.sections),
+                    "error": self.error, "elapsed": (self.finished or time.time()) - self.created}
+
+
+class JobQueue:
+
+    def __init__(self, workers=JOB_WORKERS):
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pdd-job")
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def submit(self, session_id, title, work):
+        # work(job) runs on a job thread; see run_generation
+        job = Job(session_id, title)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        if job.cancel_requested:
+            job.status, job.finished = CANCELLED, time.time()
+            return
+        job.status = RUNNING
+        with start_trace("pdd") as trace:
+            job.trace = trace
+            try:
+                work(job)
+                job.status = DONE
+                job.set_stage("done")
+            except GenerationCancelled:
+                job.status = CANCELLED
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = FAILED
+            finally:
+                job.finished = time.time()
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+
+def run_generation(job, incremental, client, process_context, meta, contacts, company,
+                   use_cache=True, mode=None, similar=None, reuse=None):
+    # similar: a near-duplicate from the similarity index, applied as reuse says
+    from similarity import REFRESH, REUSE, get_similarity_index
+    if similar and reuse == REUSE:
+        incremental.adopt(client, process_context, similar)
+    elif similar and reuse == REFRESH:
+        incremental.seed_chunks(similar)
+    # every stage stops on Cancel, so a cancelled job frees its worker for the next one
+    should_cancel = lambda: job.cancel_requested
+    job.set_stage("summary")
+    with span("llm_stage"):
+        content = incremental.generate_llm_content(client, process_context, meta["title"], use_cache=use_cache,
+                                                   mode=mode, on_delta=job.on_delta, should_cancel=should_cancel)
+    check_cancelled(should_cancel)
+    job.set_stage("document")
+    with span("docx_stage"):
+        job.data = incremental.build_docx(meta, content, contacts, company)
+    # reused and structured-mode sections never streamed
+    job.set_sections(content["sections"])
+    job.last_run = incremental.summary_line()
+    # optional copy on disk, kept in a folder private to this session
+    artifact_store = get_artifact_store()
+    if artifact_store:
+        artifact_store.save(job.session_id, job.fname, job.data)
+    # remembered for near-duplicate inputs later; without a client nothing was generated
+    index = get_similarity_index()
+    if index and client and all(usable_text(text) for text in content["sections"].values()):
+        chunk_summaries = {k: v for k, v in incremental.chunk_summaries.items() if usable_text(v)}
+        with span("similarity_index"):
+            index.add(process_context, meta["title"], content, chunk_summaries)
+
+
+def submit_generation(session_id, incremental, client, process_context, meta, contacts, company,
+                      use_cache=True, mode=None, similar=None, reuse=None):
+    return get_job_queue().submit(session_id, meta["title"], lambda job: run_generation(
+        job, incremental, client, process_context, meta, contacts, company, use_cache, mode, similar, reuse
+    ))
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,1237 @@
+import io
+import hashlib
+import json
+import re
+import threading
+import types
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from copy import deepcopy
+import os
+from docx import Document
+from docx.shared import Inches, Pt, RGBColor
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT
+from docx.oxml.ns import qn
+from docx.oxml import OxmlElement, parse_xml
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.part import Part
+from docx.text.paragraph import Paragraph
+from datetime import date
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from settings import PDD_SECTIONS, GENERATION_MODES, GENERATION_MODE
+from llm_cache import LLMCache, get_llm_cache
+from config_store import load_config
+from assets import prepare_image
+from flowgraph import load_flow_json, merge_flow_patch, normalize_flow
+from flowchart import FALLBACK_DPI, FLOWCHART_FORMAT, flowchart_layout, png_size, render_flowchart, split_flow
+from tracing import span, submit
+from scheduler import (
+    CANCEL_POLL_SECONDS,
+    GenerationCancelled,
+    RateBudgetExceeded,
+    check_cancelled,
+    get_scheduler,
+    is_retryable,
+)
+from routing import ROUTING_MAX_WAIT_SECONDS, ROUTING_TIMEOUT_SECONDS, choose_route
+from skeleton import (
+    TITLE_PLACEHOLDER,
+    DATE_PLACEHOLDER,
+    skeleton_key,
+    get_skeleton,
+    fill_placeholders,
+)
+
+                                                                # ==============================
+                                                                # -----------SETUP--------------
+                                                                # ==============================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, "Assets")
+# COLORS
+KMG_NAVY = RGBColor(31, 73, 125)
+BLACK = RGBColor(0, 0, 0)
+TEXT_GREY = RGBColor(80, 80, 80)
+# LLM CONCURRENCY (section prompts + flowchart request run in parallel)
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("PDD_MAX_CONCURRENCY", "5"))
+# SUMMARIZATION BUDGET (map-reduce over token-sized chunks, ~4 chars per token)
+CHARS_PER_TOKEN = 4
+SUMMARY_CHUNK_TOKENS = 3000
+# content-defined chunk boundaries: once a chunk is half full, cut after any
+# line whose crc32 is divisible by this (blank lines always qualify)
+CHUNK_BOUNDARY_DIVISOR = 16
+FLOW_INPUT_TOKENS = 3000
+# flow answers that can't be read at all are asked for again this many times
+FLOW_JSON_RETRIES = 1
+# written in place of the diagram when it can't be drawn (benchmarks look for it)
+FLOWCHART_ERROR = "Could not generate flowchart"
+# PROMPT TOKEN BUDGET per document (estimated input tokens over every call; 0 = no limit)
+DOCUMENT_TOKEN_BUDGET = int(os.getenv("PDD_DOCUMENT_TOKEN_BUDGET", "250000"))
+                                                                # ==============================
+                                                                # ------HELPER FUNCTIONS--------
+                                                                # ==============================
+
+
+def set_font(run, name="Trebuchet MS", size=11, color=None, bold=False, italic=False, underline=False):
+
+    run.font.name = name
+    run.font.size = Pt(size)
+    run.bold = bold
+    run.italic = italic
+    run.underline = underline
+    if color: run.font.color.rgb = color
+
+class SectionGenerationError(Exception):
+    # a section or the flowchart could not be generated (retries used up,
+    # token budget spent); the run fails rather than put the error text or
+    # a made-up chart in the document
+    pass
+
+def stream_completion(client, prompt, model, on_delta, **params):
+    # on_delta(text_so_far) per streamed token batch; the result is shaped
+    # like a normal completion so callers don't care how it was fetched
+    stream = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=model,
+        stream=True,
+        **params
+    )
+    parts, usage = [], None
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                on_delta("".join(parts))
+            # Groq reports usage on the last chunk under x_groq
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None) or usage
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+    message = types.SimpleNamespace(role="assistant", content="".join(parts))
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+def chat_completion(client, prompt, model, use_cache=True, parse=None, on_delta=None, route=None,
+                    max_retries=None, max_wait=None, timeout=None, should_cancel=None, **params):
+    # cached in front of Groq; keyed by model + prompt (which carries the input text)
+    key = LLMCache.make_key(model, prompt, **params)
+    if timeout is not None:
+        params["timeout"] = timeout
+    prompt_tokens = estimate_tokens(prompt)
+    with span(f"llm {model}", model=model, prompt_chars=len(prompt), estimated_tokens=prompt_tokens, cached=False,
+              retries=0, streamed=bool(on_delta), route=route) as s:
+        if use_cache:
+            cached = get_llm_cache().get(key)
+            if cached is not None:
+                s.update(cached=True, output_chars=len(cached))
+                if on_delta:
+                    on_delta(cached)
+                return parse(cached) if parse else cached
+
+        budget = _token_budget.get()
+        if budget is not None:
+            budget.charge(prompt_tokens)
+
+        if on_delta:
+            create = lambda: stream_completion(client, prompt, model, on_delta, **params)
+        else:
+            create = lambda: client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=model,
+                **params
+            )
+        # shared scheduler: per-model rate budget, priorities, retries with backoff
+        try:
+            completion, retries = get_scheduler().run(
+                create,
+                model, prompt_tokens,
+                on_retry=lambda attempt, error, delay: s.update(retries=attempt),
+                max_retries=max_retries, max_wait=max_wait, should_cancel=should_cancel
+            )
+        except BaseException:
+            # no answer (no rate budget in time, 429, timeout): only the call
+            # that does answer, e.g. the routed fallback, counts for the prompt
+            if budget is not None:
+                budget.refund(prompt_tokens)
+            raise
+        content = completion.choices[0].message.content
+        usage = getattr(completion, "usage", None)
+        s.update(retries=retries, output_chars=len(content or ""),
+                 prompt_tokens=getattr(usage, "prompt_tokens", None),
+                 completion_tokens=getattr(usage, "completion_tokens", None))
+        # parse before storing so malformed responses never get cached
+        result = parse(content) if parse else content
+        get_llm_cache().put(key, content)
+        return result
+
+def routed_completion(client, prompt, task, use_cache=True, parse=None, on_delta=None, should_cancel=None,
+                      **params):
+    # the model is picked per call (routing.py); a 70B route falls back to 8B
+    # when its rate budget is exhausted or the request is limited or slow
+    route = choose_route(task, estimate_tokens(prompt))
+    if not route.fallback:
+        return chat_completion(client, prompt, route.model, use_cache, parse, on_delta, route=route.reason,
+                               should_cancel=should_cancel, **params)
+    try:
+        return chat_completion(client, prompt, route.model, use_cache, parse, on_delta, route=route.reason,
+                               max_retries=0, max_wait=ROUTING_MAX_WAIT_SECONDS, timeout=ROUTING_TIMEOUT_SECONDS,
+                               should_cancel=should_cancel, **params)
+    except RateBudgetExceeded:
+        reason = f"{route.model} rate budget"
+    except Exception as e:
+        if not is_retryable(e):
+            raise
+        reason = f"{type(e).__name__} on {route.model}"
+    with span("route fallback", task=task, routed_from=route.model, reason=reason):
+        return chat_completion(client, prompt, route.fallback, use_cache, parse, on_delta,
+                               route=f"fallback: {reason}", should_cancel=should_cancel, **params)
+
+# local stand-in for the Llama 3 tokenizer: a word is one token (long words
+# one more per 8 letters), digits go in threes, every other symbol and each
+# run of line breaks is one; spaces merge into the word that follows
+_TOKEN_PIECES = re.compile(r"[^\W\d_]+|\d{1,3}|\n+|[^\w\s]|_")
+_LONG_WORDS = re.compile(r"[^\W\d_]{9,}")
+
+def estimate_tokens(text):
+    pieces = len(_TOKEN_PIECES.findall(text))
+    return pieces + sum((len(word) - 1) // 8 for word in _LONG_WORDS.findall(text)) + 1
+
+def compact_prompt(text):
+    # strip indentation and trailing space, keep at most one blank line:
+    # triple-quoted templates otherwise send their indentation on every call
+    lines = [line.strip() for line in text.strip().split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+class TokenBudgetExceeded(Exception):
+    pass
+
+class TokenBudget:
+    # estimated prompt tokens sent for one document, shared by its worker threads
+
+    def __init__(self, limit=DOCUMENT_TOKEN_BUDGET):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def charge(self, tokens):
+        with self._lock:
+            if self.limit and self.used + tokens > self.limit:
+                raise TokenBudgetExceeded(
+                    f"document token budget of {self.limit:,} reached ({self.used:,} used, {tokens:,} more needed)"
+                )
+            self.used += tokens
+
+    def refund(self, tokens):
+        with self._lock:
+            self.used = max(0, self.used - tokens)
+
+_token_budget = ContextVar("pdd_token_budget", default=None)
+
+@contextmanager
+def token_budget(limit=DOCUMENT_TOKEN_BUDGET):
+    # every call made inside (tracing.submit carries it into pool threads)
+    # is charged to one budget
+    budget = TokenBudget(limit)
+    token = _token_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _token_budget.reset(token)
+
+@contextmanager
+def llm_pool(max_workers=None):
+    # a ThreadPoolExecutor for concurrent LLM calls; when the block raises (a
+    # failed section, a cancelled run) calls that have not started are dropped
+    # and calls in flight are not waited for, their answers are thrown away
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers or MAX_CONCURRENT_LLM_CALLS))
+    try:
+        yield pool
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown(wait=True)
+
+def gather(futures, should_cancel=None):
+    # {key: future} -> {key: result}; raises the first failure as soon as it
+    # happens, and GenerationCancelled once should_cancel() returns true
+    # (a request that is already out can't be stopped, but isn't waited for)
+    pending = set(futures.values())
+    while pending:
+        done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS if should_cancel else None,
+                             return_when=FIRST_EXCEPTION)
+        for fut in done:
+            fut.result()
+        check_cancelled(should_cancel)
+    return {key: fut.result() for key, fut in futures.items()}
+
+def split_into_chunks(text, max_tokens=SUMMARY_CHUNK_TOKENS):
+    # pack whole lines into chunks of roughly max_tokens; only a single line
+    # longer than the budget gets cut mid-way
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text]
+    # boundaries follow the content, so an edit only changes the chunk(s)
+    # around it and the rest keep their hash (see incremental.py)
+    min_chars = max_chars // 2
+    chunks, current, current_len = [], [], 0
+    for line in text.split("\n"):
+        while len(line) > max_chars:
+            if current:
+                chunks.append("\n".join(current))
+                current, current_len = [], 0
+            chunks.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and current_len + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, current_len = [], 0
+        current.append(line)
+        current_len += len(line) + 1
+        if current_len >= min_chars and zlib.crc32(line.encode("utf-8")) % CHUNK_BOUNDARY_DIVISOR == 0:
+            chunks.append("\n".join(current))
+            current, current_len = [], 0
+    if current and "\n".join(current).strip():
+        chunks.append("\n".join(current))
+    return chunks or [""]
+
+def flow_prompt(process_details):
+    # instructions first, the process last
+    process_details = process_details[:FLOW_INPUT_TOKENS * CHARS_PER_TOKEN]
+    return (f"Break the process below into a structured flowchart with actions and decisions. "
+            f"Return ONLY a JSON object with this structure: "
+            f"{{\"nodes\": [ {{\"id\": \"1\", \"label\": \"Step Name\", \"type\": \"action/decision\"}} ], "
+            f"\"edges\": [ {{\"from\": \"1\", \"to\": \"2\", \"label\": \"Yes/No (optional)\"}} ] }}"
+            f"\n\nProcess:\n{process_details.strip()}")
+
+def parse_flow(text):
+    # -> (normalized flow, problems); raising keeps unusable answers out of the cache
+    flow_data, problems = normalize_flow(load_flow_json(text))
+    if flow_data is None:
+        raise ValueError("flow JSON has no steps")
+    return flow_data, problems
+
+def flow_repair_prompt(process_details, flow_data, problems):
+    # only the broken part is asked for: the answer is a patch, not a new flow
+    process_details = process_details[:FLOW_INPUT_TOKENS * CHARS_PER_TOKEN]
+    issues = "\n".join(f"- {problem}" for problem in problems)
+    flow_json = json.dumps(flow_data, ensure_ascii=False, separators=(",", ":"))
+    return (f"The flowchart JSON below was drawn from the process that follows it and has these problems:\n"
+            f"{issues}\n\n"
+            f"Fix only these problems. Return ONLY a JSON object with the nodes to add or correct and the "
+            f"edges to add, in the same format: "
+            f"{{\"nodes\": [ {{\"id\": \"1\", \"label\": \"Step Name\", \"type\": \"action/decision\"}} ], "
+            f"\"edges\": [ {{\"from\": \"1\", \"to\": \"2\", \"label\": \"Yes/No (optional)\"}} ] }}"
+            f"\n\nFlowchart:\n{flow_json}\n\nProcess:\n{process_details.strip()}")
+
+def repair_flow(client, process_details, flow_data, problems, use_cache=True, should_cancel=None):
+    # keeps the locally repaired flow when the re-ask fails or makes it worse
+    prompt = flow_repair_prompt(process_details, flow_data, problems)
+    with span("flow_repair", problems=len(problems)) as s:
+        try:
+            patch = routed_completion(client, prompt, "flow", use_cache=use_cache, parse=load_flow_json,
+                                      should_cancel=should_cancel, response_format={ "type": "json_object" })
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            s["error"] = type(e).__name__
+            return flow_data
+        repaired, remaining = normalize_flow(merge_flow_patch(flow_data, patch))
+        if repaired is None or len(remaining) > len(problems):
+            s["rejected"] = True
+            return flow_data
+        s["remaining"] = len(remaining)
+        return repaired
+
+def get_smart_flow_data(client, process_details, use_cache=True, should_cancel=None):
+    # only answers that aren't usable flow JSON are asked again, and then
+    # drawn as a single "Start" step; a request that fails fails the run
+    prompt = flow_prompt(process_details)
+    with span("flow_json") as s:
+        flow_data, problems = None, []
+        # without a client (no API key) nothing is asked
+        for attempt in range(FLOW_JSON_RETRIES + 1 if client else 0):
+            try:
+                flow_data, problems = routed_completion(client, prompt, "flow", use_cache=use_cache,
+                                                        parse=parse_flow, should_cancel=should_cancel,
+                                                        response_format={ "type": "json_object" })
+                break
+            except ValueError:
+                s["reasks"] = attempt + 1
+            except GenerationCancelled:
+                raise
+            except Exception as e:
+                s["error"] = type(e).__name__
+                raise SectionGenerationError(
+                    f"the flowchart could not be generated ({type(e).__name__}: {e})") from e
+        if flow_data is None:
+            s["fallback"] = True
+            flow_data = {"nodes": [{"id":"1", "label":"Start", "type":"action"}], "edges": []}
+        elif problems:
+            s["problems"] = len(problems)
+            flow_data = repair_flow(client, process_details, flow_data, problems, use_cache, should_cancel)
+        s.update(nodes=len(flow_data.get("nodes", [])), edges=len(flow_data.get("edges", [])))
+        return flow_data
+    
+ 
+SUMMARY_INSTRUCTIONS = compact_prompt("""
+    Summarize the following process in a concise way.
+    Keep only key steps, systems used, inputs, outputs and decision points.
+    """)
+
+MERGE_INSTRUCTIONS = compact_prompt("""
+    The following are summaries of consecutive parts of one process, in order.
+    Merge them into a single concise summary of the whole process.
+    Keep only key steps, systems used, inputs, outputs and decision points.
+    Keep the order of steps and remove repetition.
+    """)
+
+def summarize_chunk(client, chunk, use_cache=True, should_cancel=None):
+    # no "part i of N" in the prompt: the summary depends on the chunk text only,
+    # so it is memoized by chunk hash wherever the chunk moves after an edit
+    # (incremental.py); merge_summaries is told the parts are in order
+    prompt = f"{SUMMARY_INSTRUCTIONS}\n\nProcess:\n{chunk.strip()}"
+
+    return routed_completion(client, prompt, "summary", use_cache=use_cache, should_cancel=should_cancel)
+
+def merge_summaries(client, summaries, use_cache=True, should_cancel=None):
+    joined = "\n\n".join(f"Part {i}:\n{text.strip()}" for i, text in enumerate(summaries, 1))
+    prompt = f"{MERGE_INSTRUCTIONS}\n\nSummaries:\n{joined}"
+
+    return routed_completion(client, prompt, "merge", use_cache=use_cache, should_cancel=should_cancel)
+
+def chunk_hash(chunk):
+    # whitespace-only edits don't change what the model is asked to summarize
+    return hashlib.sha256(" ".join(chunk.split()).encode("utf-8")).hexdigest()
+
+def get_short_context(client, process_details, use_cache=True, chunk_memo=None, should_cancel=None):
+    # chunk_memo: optional {chunk_hash: summary} dict; known chunks are not re-sent.
+    # should_cancel() is checked before and while each chunk and merge request
+    # waits, and raises GenerationCancelled once it returns true
+    if not client:
+        return process_details[:3000]
+
+    with span("summary", input_chars=len(process_details)) as s:
+        short_context = _map_reduce_summary(client, process_details, use_cache, chunk_memo, should_cancel)
+        s["output_chars"] = len(short_context)
+        return short_context
+
+def _summarize_chunk_memo(client, chunk, use_cache, chunk_memo, should_cancel=None):
+    if chunk_memo is None:
+        return summarize_chunk(client, chunk, use_cache, should_cancel)
+    key = chunk_hash(chunk)
+    if key not in chunk_memo:
+        chunk_memo[key] = summarize_chunk(client, chunk, use_cache, should_cancel)
+    return chunk_memo[key]
+
+def _map_reduce_summary(client, process_details, use_cache, chunk_memo=None, should_cancel=None):
+    chunks = split_into_chunks(process_details, SUMMARY_CHUNK_TOKENS)
+    if len(chunks) == 1:
+        return _summarize_chunk_memo(client, chunks[0], use_cache, chunk_memo, should_cancel)
+
+    # MAP: summarize every chunk in parallel
+    with llm_pool() as pool:
+        futures = {i: submit(pool, _summarize_chunk_memo, client, chunk, use_cache, chunk_memo, should_cancel)
+                   for i, chunk in enumerate(chunks)}
+        summaries = list(gather(futures, should_cancel).values())
+
+        # REDUCE: merge neighbouring summaries in groups that fit the budget
+        # until a single short_context is left
+        while len(summaries) > 1:
+            groups, current, current_tokens = [], [], 0
+            for text in summaries:
+                tokens = estimate_tokens(text)
+                if current and (current_tokens + tokens > SUMMARY_CHUNK_TOKENS):
+                    groups.append(current)
+                    current, current_tokens = [], 0
+                current.append(text)
+                current_tokens += tokens
+            groups.append(current)
+            if len(groups) == len(summaries):
+                # nothing fits together; cut each summary down so pairs can merge
+                limit = SUMMARY_CHUNK_TOKENS * CHARS_PER_TOKEN // 2
+                groups = [[t[:limit] for t in summaries[i:i + 2]] for i in range(0, len(summaries), 2)]
+            futures = {i: submit(pool, merge_summaries, client, group, use_cache, should_cancel)
+                       for i, group in enumerate(groups) if len(group) > 1}
+            merged = gather(futures, should_cancel)
+            summaries = [merged.get(i, group[0]) for i, group in enumerate(groups)]
+
+    return summaries[0]
+
+def section_prompts(context_title):
+    return {
+
+        "INTRODUCTION":
+        f"""
+        Provide a brief introduction for the process '{context_title}'.
+
+        Write in paragraph form covering:
+        - business context
+        - what the process does
+        - systems involved
+        """,
+
+        "AUDIENCE":
+        f"""
+        Identify the intended audience for this document.
+
+        Start with one short paragraph explaining who should use this document,
+        followed by a bullet list of roles.
+        """,
+
+        "PURPOSE":
+        f"""
+        Explain the purpose of this document in paragraph form.
+
+        Cover:
+        - why this document is created
+        - how it will be used
+
+        Do not create a document objective.
+        """,
+
+        "SCOPE":
+        f"""
+        Define the scope of the process '{context_title}' in paragraph form.
+
+        Then provide the following as a list, each item on a new line:
+        - in scope
+        - out of scope
+        - start point
+        - end point
+        """
+    }
+
+# writing rules shared by every section prompt and the structured one
+SECTION_RULES = compact_prompt("""
+    You are writing a Process Design Document from the context below.
+
+    Write in a professional and technical tone.
+    Do not generate sub-headings and do not repeat the section title inside the content.
+    Write the content in well-structured paragraphs.
+    Where a list is required, put each item on a new line, without *, - or numbers and without manual bullets.
+    Plain text only: no markdown, no asterisks, no additional headings.
+    """)
+
+def shared_prefix(process_details):
+    # rules + context come first and are byte-identical for every call on one
+    # summary, so the provider can reuse the prefix; only the task differs
+    return f"{SECTION_RULES}\n\nContext:\n{process_details.strip()}\n\n"
+
+def build_section_prompt(section_name, process_details, context_title):
+    task = compact_prompt(section_prompts(context_title).get(section_name, ""))
+    return f"{shared_prefix(process_details)}Task:\n{task}"
+
+def generate_ai_content(client, section_name, process_details, context_title, use_cache=True, on_delta=None,
+                        should_cancel=None):
+    # on_delta(section_name, text_so_far) streams the section as it is written;
+    # it may raise GenerationCancelled to stop the run, as should_cancel() does
+    # while the request waits for rate budget or a retry
+
+    if not client:
+        return "[API Key Missing]"
+
+    prompt = build_section_prompt(section_name, process_details, context_title)
+    stream_to = None
+    if on_delta:
+        stream_to = lambda text: on_delta(section_name, text)
+        # give the caller a chance to cancel before the request goes out
+        stream_to("")
+    check_cancelled(should_cancel)
+
+    with span(f"section {section_name}") as s:
+        try:
+            content = routed_completion(client, prompt, f"section:{section_name}", use_cache=use_cache,
+                                        on_delta=stream_to, should_cancel=should_cancel)
+
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            s["error"] = type(e).__name__
+            raise SectionGenerationError(
+                f"the {section_name} section could not be generated ({type(e).__name__}: {e})") from e
+        s["output_chars"] = len(content)
+        return content
+
+def generate_all_content(client, short_context, context_title, max_workers=None, use_cache=True, on_delta=None,
+                         should_cancel=None):
+    # every request only depends on short_context, so fire them together
+    # and collect the results keyed by section (order is restored by the caller)
+    with llm_pool(max_workers) as pool:
+        futures = {
+            name: submit(pool, generate_ai_content, client, name, short_context, context_title, use_cache,
+                         on_delta, should_cancel)
+            for name in PDD_SECTIONS
+        }
+        futures["FLOW"] = submit(pool, get_smart_flow_data, client, short_context, use_cache, should_cancel)
+        results = gather(futures, should_cancel)
+    flow_data = results.pop("FLOW")
+    return results, flow_data
+
+def structured_prompt(short_context, context_title):
+    prompts = section_prompts(context_title)
+    instructions = "\n\n".join(
+        f"{name}:\n{compact_prompt(prompts[name])}" for name in PDD_SECTIONS
+    )
+    return f"""{shared_prefix(short_context)}Task:
+Write the following sections of the Process Design Document for '{context_title}'.
+
+{instructions}
+
+FLOW:
+Break the process into a structured flowchart with actions and decisions.
+
+Inside the JSON values put list items on their own line with \\n.
+
+Return ONLY a JSON object with this structure:
+{{"introduction": "...", "audience": "...", "purpose": "...", "scope": "...",
+"flow": {{"nodes": [ {{"id": "1", "label": "Step Name", "type": "action/decision"}} ],
+"edges": [ {{"from": "1", "to": "2", "label": "Yes/No (optional)"}} ] }} }}"""
+
+def validate_structured_content(data):
+    # returns (sections, flow_data or None, names of the parts that failed,
+    # problems normalize_flow left in the flow)
+    if not isinstance(data, dict):
+        return {}, None, PDD_SECTIONS + ["FLOW"], []
+    sections, failed = {}, []
+    for name in PDD_SECTIONS:
+        value = data.get(name.lower(), data.get(name))
+        if isinstance(value, list):
+            value = "\n".join(str(item) for item in value)
+        if isinstance(value, str) and value.strip():
+            sections[name] = value
+        else:
+            failed.append(name)
+    flow_data, flow_problems = normalize_flow(data.get("flow"))
+    if flow_data is None:
+        failed.append("FLOW")
+        flow_problems = []
+    return sections, flow_data, failed, flow_problems
+
+def generate_structured_content(client, short_context, context_title, max_workers=None, use_cache=True,
+                                on_delta=None, should_cancel=None):
+    # one 70B call returns every section plus the flow graph; only the parts
+    # that fail validation are re-asked through the per-section prompts, and
+    # a flow with problems left after normalize_flow only for those
+    if not client:
+        return generate_all_content(client, short_context, context_title, max_workers, use_cache, on_delta,
+                                    should_cancel)
+
+    prompt = structured_prompt(short_context, context_title)
+    # the JSON is only useful once complete, so it streams under "STRUCTURED"
+    stream_to = (lambda text: on_delta("STRUCTURED", text)) if on_delta else None
+    with span("structured") as s:
+        try:
+            data = routed_completion(client, prompt, "structured", use_cache=use_cache,
+                                     parse=json.loads, on_delta=stream_to, should_cancel=should_cancel,
+                                     response_format={ "type": "json_object" })
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            s["error"] = type(e).__name__
+            data = None
+        section_content, flow_data, failed, flow_problems = validate_structured_content(data)
+        s["failed"] = ",".join(failed)
+
+    if failed or flow_problems:
+        with llm_pool(max_workers) as pool:
+            futures = {
+                name: submit(pool, generate_ai_content, client, name, short_context, context_title, use_cache,
+                             on_delta, should_cancel)
+                for name in failed if name != "FLOW"
+            }
+            if flow_data is None:
+                futures["FLOW"] = submit(pool, get_smart_flow_data, client, short_context, use_cache,
+                                         should_cancel)
+            elif flow_problems:
+                futures["FLOW"] = submit(pool, repair_flow, client, short_context, flow_data, flow_problems,
+                                         use_cache, should_cancel)
+            results = gather(futures, should_cancel)
+        flow_data = results.pop("FLOW", flow_data)
+        section_content.update(results)
+    return section_content, flow_data
+
+def insert_constant_header(document, title, client_name, date_str, logo_path, client_cfg):
+
+    section = document.sections[-1]
+    header = section.header
+
+    # usable page width
+    usable_width = section.page_width - section.left_margin - section.right_margin
+
+    # create table in header (WIDTH MANDATORY)
+    htab = header.add_table(rows=4, cols=3, width=usable_width)
+    htab.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    htab.autofit = False
+    htab.style = "Table Grid"
+
+    from docx.shared import Emu
+    htab.columns[0].width = Emu(int(usable_width * 0.5))
+    htab.columns[1].width = Emu(int(usable_width * 0.3))
+    htab.columns[2].width = Emu(int(usable_width * 0.2))
+
+    def fill_h(row, col, text, is_bold=False):
+
+        cell = htab.cell(row, col)
+        p = cell.paragraphs[0]
+        p.paragraph_format.space_before = Pt(0)
+        p.paragraph_format.space_after = Pt(0)
+        cell.vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
+        htab.rows[row].height = Pt(12)  
+        r = p.add_run(text)
+        set_font(r, name="Calibri", size=10, color=TEXT_GREY, bold=is_bold)
+    title_cell = htab.cell(0, 0).merge(htab.cell(0, 1))
+    p = title_cell.paragraphs[0]
+    p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    run = p.add_run(f"Process Flow Document for {title}")
+    set_font(run, name="Calibri", size=10, color=TEXT_GREY, bold=True)
+    fill_h(1, 0, f"Date: {date_str}")
+    fill_h(2, 0, "Version: 0.1")
+    fill_h(3, 0, f"Document Owner: {client_cfg['Document Owner']}")
+    fill_h(1, 1, f"Classification: {client_cfg['Classification']}")
+    fill_h(2, 1, f"Circulation: {client_cfg['Circulation']}")
+    fill_h(3, 1, f"Client: {client_cfg['Client Name']}")
+
+                                                            # ==============================
+                                                            # --- LOGO CENTERING LOGIC ---
+                                                            # ==============================
+
+    logo_cell = htab.cell(0, 2).merge(htab.cell(3, 2))
+    logo_cell.vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER # Vertical center
+
+    if os.path.exists(logo_path):
+        lp = logo_cell.paragraphs[0]
+        lp.alignment = WD_ALIGN_PARAGRAPH.CENTER # Horizontal center
+        lp.add_run().add_picture(prepare_image(logo_path, 1.1), width=Inches(1.1))
+    header.add_paragraph().paragraph_format.space_after = Pt(12)
+
+                                                            # ==============================
+                                                            # ----------PIPELINE------------
+                                                            # ==============================
+
+def resolve_client_meta(clients, branding, client_code):
+    client_cfg = clients.get(client_code)
+    if client_cfg is None:
+        client_cfg = list(clients.values())[0]
+    brand = branding.get(client_code, {})
+    logo_file = brand.get("Logo", "KMG_LOGO.png")
+    banner_file = brand.get("Banner", "KMG_BANNER.png")
+
+    return {
+        "client_cfg": client_cfg,
+        "logo_path": os.path.join(ASSETS_DIR, logo_file),
+        "banner_path": os.path.join(ASSETS_DIR, banner_file),
+    }
+
+def resolve_document_meta(clients, branding, source_name=None, manual_text=""):
+    if source_name:
+        raw_filename = os.path.basename(source_name).rsplit('.', 1)[0]
+        dynamic_title = raw_filename.replace('_', ' ').replace('-', ' ').title()
+        client_name = dynamic_title.split(' ')[0]
+        client_code = client_name.upper()
+    else:
+        #create dynamic title from manual input
+        first_line = manual_text.strip().split("\n")[0]
+
+        if first_line:
+            dynamic_title = first_line[:60]
+        else:
+            dynamic_title = "Process Design Document"
+
+        client_name = dynamic_title.split(" ")[0].upper()
+        client_code = client_name
+
+    meta = {"title": dynamic_title, "client_name": client_name}
+    meta.update(resolve_client_meta(clients, branding, client_code))
+    return meta
+
+def document_filename(dynamic_title):
+    return f"KMG_PDD_{dynamic_title.replace(' ', '_')}.docx"
+
+def document_to_bytes(doc):
+    # serialize without touching the working directory
+    with span("docx_save") as s:
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        s["output_bytes"] = buffer.tell()
+        return buffer.getvalue()
+
+def generate_llm_content(client, process_context, dynamic_title, use_cache=True, mode=None, on_delta=None,
+                         should_cancel=None):
+    with token_budget():
+        short_context = get_short_context(client, process_context, use_cache=use_cache, should_cancel=should_cancel)
+        if (mode or GENERATION_MODE) == "structured":
+            section_content, flow_data = generate_structured_content(
+                client, short_context, dynamic_title, use_cache=use_cache, on_delta=on_delta,
+                should_cancel=should_cancel
+            )
+        else:
+            # all section prompts + the flowchart request go out concurrently
+            section_content, flow_data = generate_all_content(client, short_context, dynamic_title,
+                                                              use_cache=use_cache, on_delta=on_delta,
+                                                              should_cancel=should_cancel)
+    return {"short_context": short_context, "sections": section_content, "flow_data": flow_data}
+
+def build_front_matter(meta, contacts, company, today=None):
+    # cover page, header, contents, page numbers and version history
+    dynamic_title = meta["title"]
+    client_name = meta["client_name"]
+    client_cfg = meta["client_cfg"]
+    logo_path = meta["logo_path"]
+    banner_path = meta["banner_path"]
+    today = today or date.today().strftime("%m/%d/%Y")
+
+    doc = Document()
+    section = doc.sections[0]
+    section.left_margin = Inches(0.7)
+    section.right_margin = Inches(0.7)
+    section.top_margin = Inches(0.7)
+    section.bottom_margin = Inches(0.7)
+    for section in doc.sections:
+        section.header_distance = Inches(0.6)
+    for sec in doc.sections:
+        sec.footer_distance = Inches(0.5)
+    from docx.enum.text import WD_LINE_SPACING
+    style = doc.styles['Normal']
+    style.font.name = 'Trebuchet MS'
+    style.font.size = Pt(10)
+    pformat = style.paragraph_format
+    pformat.space_before = Pt(0)
+    pformat.space_after = Pt(0)
+    pformat.line_spacing_rule = WD_LINE_SPACING.SINGLE
+    pformat.line_spacing = 1
+
+                                                            # ==============================
+                                                            # PAGE 1: COVER PAGE
+                                                            # ==============================
+
+    cover_table = doc.add_table(rows=1, cols=1)
+    cover_table.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    cover_table.autofit = False
+    cover_table.columns[0].width = Inches(6.2)
+    cover_cell = cover_table.cell(0, 0)
+    p_title = cover_cell.add_paragraph()
+    p_title.paragraph_format.space_before = Pt(20)
+    set_font(p_title.add_run(dynamic_title), size=28, color=KMG_NAVY, bold=True)
+    p_title.paragraph_format.space_after = Pt(12)
+    # Subtitle → Process Flow Document
+    p_sub = cover_cell.add_paragraph()
+    p_sub.paragraph_format.space_before = Pt(0)
+    p_sub.paragraph_format.space_after = Pt(2)
+    run_sub = p_sub.add_run("Process Flow Document")
+    set_font(
+        run_sub,
+        name="Trebuchet MS",
+        size=14,
+        color=BLACK,
+        bold=True
+    )
+    # Description → Document describing the process of xyz
+    p_desc = cover_cell.add_paragraph()
+    p_desc.paragraph_format.space_before = Pt(0)
+    run_desc = p_desc.add_run(f"Document describing the process of {dynamic_title}")
+    set_font(
+        run_desc,
+        name="Trebuchet MS",
+        size=10,
+        color=TEXT_GREY,
+        italic=True
+    )
+    p_desc.paragraph_format.space_after = Pt(60)
+
+    def add_meta_line_bold(label, value):
+        p = cover_cell.add_paragraph()
+        p.paragraph_format.space_after = Pt(0)
+        run = p.add_run(f"{label} {value}")
+        set_font(run, name="Trebuchet MS", size=9, bold=True, color=BLACK)
+    add_meta_line_bold("Ref #", "Process Flow Document")
+    add_meta_line_bold("Date:", today)
+    kmg = contacts.get("KMG_CONTACT", {})
+    add_meta_line_bold(
+        "KMG Contact:",
+        f"{kmg.get('Name','')} | {kmg.get('Email','')}"
+                    )
+    cover_cell.add_paragraph().paragraph_format.space_after = Pt(8)
+    # Calculate usable width (once)
+    section = doc.sections[0]
+    page_width = section.page_width
+    left_margin = section.left_margin
+    right_margin = section.right_margin
+    usable_width = page_width - left_margin - right_margin
+    # Top blue line
+    line_top = cover_cell.add_paragraph()
+    line_top.paragraph_format.space_after = Pt(4)
+    run = line_top.add_run(" ")
+    run.font.size = Pt(1)
+    p = line_top._p
+    pPr = p.get_or_add_pPr()
+    pBdr = OxmlElement('w:pBdr')
+    bottom = OxmlElement('w:bottom')
+    bottom.set(qn('w:val'), 'single')
+    bottom.set(qn('w:sz'), '24')
+    bottom.set(qn('w:color'), '1F497D')
+    pBdr.append(bottom)
+    pPr.append(pBdr)
+
+    if os.path.exists(banner_path):
+        p_img = cover_cell.add_paragraph()
+        p_img.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        p_img.add_run().add_picture(prepare_image(banner_path, 7), width=Inches(7))
+    # Bottom blue line
+    line_bottom = cover_cell.add_paragraph()
+    line_bottom.paragraph_format.space_before = Pt(4)
+    run = line_bottom.add_run(" ")
+    run.font.size = Pt(1)
+    p = line_bottom._p
+    pPr = p.get_or_add_pPr()
+    pBdr = OxmlElement('w:pBdr')
+    bottom = OxmlElement('w:bottom')
+    bottom.set(qn('w:val'), 'single')
+    bottom.set(qn('w:sz'), '24')
+    bottom.set(qn('w:color'), '1F497D')
+    pBdr.append(bottom)
+    pPr.append(pBdr)
+    cover_cell.add_paragraph()
+    footer_tab = cover_cell.add_table(1, 2)
+    footer_tab.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    footer_tab.autofit = False
+    from docx.shared import Emu
+    total_width = usable_width
+    col1_width = Emu(int(total_width * 0.7))
+    col2_width = Emu(int(total_width * 0.3))
+    footer_tab.columns[0].width = col1_width
+    footer_tab.columns[1].width = col2_width
+    footer_tab.cell(0, 0).vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
+    footer_tab.cell(0, 1).vertical_alignment = WD_CELL_VERTICAL_ALIGNMENT.CENTER
+    cell = footer_tab.cell(0, 0)
+    # Company name
+    p1 = cell.paragraphs[0]
+    run_company = p1.add_run(company["Company Name"])
+    set_font(run_company, name="Trebuchet MS", size=12, bold=True)
+    p1.paragraph_format.space_after = Pt(6)
+    # Address
+    p2 = cell.add_paragraph()
+    run_addr = p2.add_run(company["address"])
+    set_font(run_addr, name="Trebuchet MS", size=10)
+    # Phone + Fax
+    p3 = cell.add_paragraph()
+    run_contact = p3.add_run(f"Ph: {company['phone']} | Fax: {company['fax']}")
+    set_font(run_contact, name="Trebuchet MS", size=10)
+    # Website + social
+    p4 = cell.add_paragraph()
+    run_web = p4.add_run(f"{company['website']} | {company['social']}")
+    set_font(run_web, name="Trebuchet MS", size=10)
+    if os.path.exists(logo_path):
+
+        c_right = footer_tab.cell(0, 1).paragraphs[0]
+        c_right.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+        c_right.add_run().add_picture(prepare_image(logo_path, 1.1), width=Inches(1.1))
+
+                                                            # ==============================
+                                                            # PAGE 2: TABLE OF CONTENTS
+                                                            # ==============================
+
+    cover_cell.add_paragraph()
+    doc.sections[0].different_first_page_header_footer = False
+    from docx.enum.section import WD_SECTION
+    doc.add_section(WD_SECTION.NEW_PAGE)
+    doc.sections[-1].header.is_linked_to_previous = False
+    insert_constant_header(doc, dynamic_title, client_name, today, logo_path, client_cfg)
+    p = doc.add_paragraph()
+    run = p.add_run("CONTENTS")
+    set_font(run, name="Trebuchet MS", size=18, bold=True, underline=True, color=BLACK)
+    p.paragraph_format.space_after = Pt(12)
+    contents = [("1 Version History", "3"), ("   1.1 Release History", "3"), ("   1.2 Contact Information", "3"),
+
+                ("2 Introduction", "4"), ("3 Audience", "4"), ("4 Purpose", "5"), ("5 Scope", "5"), ("6 Process Flow Diagram", "6")]
+    for item, pg in contents:
+        p = doc.add_paragraph()
+        p.paragraph_format.space_before = Pt(5)  
+        p.paragraph_format.space_after = Pt(0)
+        if item.strip().startswith("1.1") or item.strip().startswith("1.2"):
+            p.paragraph_format.left_indent = Inches(0.25)
+        dots = "." * (95 - len(item))
+        run = p.add_run(f"{item} {dots} {pg}")
+        set_font(run, name="Trebuchet MS", size=11, color=BLACK)
+    # --- Page Numbering ---
+    section = doc.sections[-1]
+    footer = section.footer
+    footer.is_linked_to_previous = False
+    foot_p = footer.paragraphs[0]
+    foot_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    def create_field(parent_run, field_text):
+
+        fldChar_begin = OxmlElement('w:fldChar'); fldChar_begin.set(qn('w:fldCharType'), 'begin')
+        parent_run._r.append(fldChar_begin)
+        instrText = OxmlElement('w:instrText'); instrText.set(qn('xml:space'), 'preserve'); instrText.text = field_text
+        parent_run._r.append(instrText)
+        fldChar_end = OxmlElement('w:fldChar'); fldChar_end.set(qn('w:fldCharType'), 'end')
+        parent_run._r.append(fldChar_end)
+    run_pg = foot_p.add_run()
+    create_field(run_pg, "PAGE")
+    run_pg.add_text(" of ")
+    create_field(run_pg, "NUMPAGES")
+    set_font(foot_p.add_run(" | All Rights to this Document Reserved with Key Management Group, Inc."), size=11, color=TEXT_GREY)
+
+                                                            # ==============================
+                                                            # PAGE 3: VERSION HISTORY
+                                                            # ==============================
+
+    doc.add_page_break()
+    vh_p = doc.add_paragraph()
+    vh_p.paragraph_format.space_after = Pt(12)
+    set_font(vh_p.add_run("VERSION HISTORY"), size=18, bold=True, underline=True)
+    vh_p.paragraph_format.space_after = Pt(14)
+    p_rh = doc.add_paragraph()
+    set_font(p_rh.add_run("1.1  RELEASE HISTORY"), size=14, bold=True)
+    p_rh.paragraph_format.space_after = Pt(6)
+    rel_tab = doc.add_table(rows=5, cols=6); rel_tab.style = 'Table Grid'
+    for i, h in enumerate(["Version", "Date", "Description", "Reason", "Author(s)", "Reviewer"]):
+        set_font(rel_tab.cell(0, i).paragraphs[0].add_run(h), size=9, bold=True)
+    r1 = rel_tab.rows[1].cells
+    row_cells = rel_tab.rows[1].cells
+    author = contacts.get("AUTHOR", {})
+    data = [
+        "0.1",
+        today,
+        "Initial Draft",
+        f"Process Design for {dynamic_title}",
+
+        f"{author.get('Name','').replace(' ', chr(10))}",
+        ""
+    ]
+    for i, val in enumerate(data):
+        p = row_cells[i].paragraphs[0]
+        run = p.add_run(val)
+        set_font(run, size=9)  
+    gap = doc.add_paragraph()
+    gap.paragraph_format.space_after = Pt(10)
+    p_contact = doc.add_paragraph()
+    p_contact.paragraph_format.space_before = Pt(4)
+    p_contact.paragraph_format.space_after = Pt(6)
+    set_font(p_contact.add_run("1.2  CONTACT INFORMATION"), size=12, bold=True)
+    p_contact_text = doc.add_paragraph()
+    run = p_contact_text.add_run(
+        f"{contacts['KMG_CONTACT']['Name']} | "
+        f"{contacts['KMG_CONTACT']['Title']} | "
+        f"{contacts['KMG_CONTACT']['Email']}\n"
+    )
+    set_font(run, size=9)
+    p_contact_text.paragraph_format.space_after = Pt(10)
+    p_comp = doc.add_paragraph()
+    p_comp.paragraph_format.space_before = Pt(6)
+    run = p_comp.add_run("Company Information,")
+    set_font(run, size=10, bold=True, italic=True)
+    run = p_comp.add_run("\nKey Management Group, Inc.")
+    set_font(run, size=9)
+    run = p_comp.add_run("\n420 Jericho Turnpike, Suite #215, Jericho. NY - 11753")
+    set_font(run, size=9)
+    run = p_comp.add_run("\nwww.kmgus.com | 631-777-2424 (phone) | 631-777-2626 (fax)")
+    set_font(run, size=9)
+    return doc
+
+def clone_front_matter(meta, contacts, company, today=None):
+    # the front matter only varies by title and date within a client, so it
+    # is compiled once per client into a skeleton and cloned from there
+    today = today or date.today().strftime("%m/%d/%Y")
+    key = skeleton_key(meta, contacts, company)
+    skeleton = get_skeleton(key, lambda: document_to_bytes(
+        build_front_matter(dict(meta, title=TITLE_PLACEHOLDER), contacts, company, DATE_PLACEHOLDER)
+    ))
+    doc = Document(io.BytesIO(skeleton))
+    fill_placeholders(doc, {TITLE_PLACEHOLDER: meta["title"], DATE_PLACEHOLDER: today})
+    return doc
+
+def compile_client_skeletons(config=None):
+    # warm the skeleton cache for every client in Config.xlsx (used by batch runs)
+    branding, contacts, company, clients = config or load_config()
+    for client_code in clients:
+        meta = resolve_client_meta(clients, branding, client_code)
+        meta.update(title=TITLE_PLACEHOLDER, client_name=client_code)
+        clone_front_matter(meta, contacts, company)
+
+def classify_block(block):
+    # LIST ITEM → short line
+    lower_block = block.lower()
+
+    is_main_scope = lower_block in ["in scope", "out of scope"]
+
+    is_intro_line = (
+        block.endswith(":")
+        or lower_block.startswith("the following")
+        or lower_block.startswith("the key")
+        or lower_block.startswith("key ")
+    )
+
+    if is_main_scope:
+        return "scope"
+    elif len(block.split()) <= 12 and not block.endswith(".") and not is_intro_line and len(block) < 120:
+        return "list"
+    return "paragraph"
+
+class SectionBlockWriter:
+    # streams section lines into the document right after `anchor`, keeping
+    # track of the last emitted block itself; reading doc.paragraphs[-1] per
+    # line rebuilds the whole paragraph list and makes long sections quadratic
+
+    def __init__(self, doc, anchor):
+        self._doc = doc
+        self._last_p = anchor._p
+        self.last_text = anchor.text
+        self._style_ids = {}
+        self._run_props = None
+
+    def _style_id(self, name):
+        if name not in self._style_ids:
+            self._style_ids[name] = self._doc.styles[name].style_id
+        return self._style_ids[name]
+
+    def _add_paragraph(self, text, style=None):
+        p = OxmlElement("w:p")
+        self._last_p.addnext(p)
+        self._last_p = p
+        para = Paragraph(p, self._doc._body)
+        if style:
+            para._p.style = self._style_id(style)
+        run = para.add_run(text)
+        # every body run has the same font; format the first one and clone its rPr
+        if self._run_props is None:
+            set_font(run, size=11)
+            self._run_props = deepcopy(run._r.rPr)
+        else:
+            run._r.insert(0, deepcopy(self._run_props))
+        self.last_text = text
+        return para
+
+    def write(self, content):
+        for block in content.split("\n"):
+
+            block = block.strip()
+            if not block:
+                continue
+
+            kind = classify_block(block)
+            if kind == "scope":
+
+                if self.last_text.strip().lower() == block.lower():
+                    continue
+
+                self._add_paragraph(block.title(), style="List Bullet")
+            elif kind == "list":
+
+                p = self._add_paragraph(block.capitalize(), style="List Bullet 2")
+                # proper wrap & alignment
+                p.paragraph_format.left_indent = Inches(0.5)
+                p.paragraph_format.first_line_indent = Inches(-0.25)
+            else:
+                para = self._add_paragraph(block)
+                para.paragraph_format.space_after = Pt(6)
+
+def add_svg_picture(run, png_bytes, svg_bytes, width):
+    # Word 2016+ draws the SVG (asvg:svgBlip extension); older readers show the PNG
+    shape = run.add_picture(io.BytesIO(png_bytes), width=width)
+    package = run.part.package
+    svg_part = Part(package.next_partname("/word/media/flowchart%d.svg"), "image/svg+xml", svg_bytes, package)
+    r_id = run.part.relate_to(svg_part, RT.IMAGE)
+    blip = shape._inline.xpath(".//a:blip")[0]
+    blip.append(parse_xml(
+        '<a:extLst xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+        ' xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<a:ext uri="{96DAC541-7B7A-43D3-8B79-37D633B846F1}">'
+        '<asvg:svgBlip xmlns:asvg="http://schemas.microsoft.com/office/drawing/2016/SVG/main"'
+        f' r:embed="{r_id}"/></a:ext></a:extLst>'
+    ))
+    return shape
+
+def add_flowchart(doc, flow_data, fmt=FLOWCHART_FORMAT):
+    # big flows go on several pages, each part sized to fit its layout box;
+    # flows kept from before normalize_flow existed are normalized here
+    flow_data, _ = normalize_flow(flow_data)
+    if flow_data is None:
+        raise ValueError("the flow has no steps")
+    parts = split_flow(flow_data)
+    for i, part in enumerate(parts, 1):
+        if i > 1:
+            doc.add_page_break()
+        if len(parts) > 1:
+            set_font(doc.add_paragraph().add_run(f"Part {i} of {len(parts)}"), size=11, bold=True)
+        with span("flowchart_render", nodes=len(part.get("nodes", [])), part=i, format=fmt) as s:
+            if fmt == "svg":
+                svg = render_flowchart(part, "svg")
+                png = render_flowchart(part, "png", dpi=FALLBACK_DPI)
+                s["output_bytes"] = len(svg) + len(png)
+            else:
+                svg = None
+                png = render_flowchart(part)
+                s["output_bytes"] = len(png)
+        # fit the box whichever side is the limit
+        box_width, box_height = flowchart_layout(part)[1]
+        px_width, px_height = png_size(png)
+        width = Inches(min(box_width, box_height * px_width / px_height))
+        p_img = doc.add_paragraph()
+        p_img.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        if svg:
+            add_svg_picture(p_img.add_run(), png, svg, width)
+        else:
+            p_img.add_run().add_picture(io.BytesIO(png), width=width)
+
+def append_pdd_body(doc, section_content, flow_data):
+                                                            # ==============================
+                                                            # PAGE 4: AI CONTENT
+                                                            # ==============================
+
+    doc.add_page_break()
+    top_gap = doc.add_paragraph()
+    top_gap.paragraph_format.space_after = Pt(12)
+    for title in PDD_SECTIONS:
+        # HEADING
+        p_head = doc.add_paragraph()
+        p_head.paragraph_format.space_before = Pt(12)
+        p_head.paragraph_format.space_after = Pt(6)
+        set_font(p_head.add_run(title), size=18, bold=True, underline=True)
+        # CONTENT PARAGRAPH
+        content = section_content[title].strip()
+        SectionBlockWriter(doc, p_head).write(content)
+
+                                                            # ==============================
+                                                            # PAGE 5: PROCESS FLOW
+                                                            # ==============================
+
+    doc.add_page_break()
+    p_flow = doc.add_paragraph()
+    p_flow.paragraph_format.space_after = Pt(12)
+    set_font(p_flow.add_run("PROCESS FLOW DIAGRAM"), size=18, bold=True, underline=True)
+    p_flow.paragraph_format.space_after = Pt(12)
+
+    try:
+        # 1. Structured JSON data already fetched in generate_all_content
+        # 2. Render in memory (cached by graph hash, no file on disk)
+        # 3. Image ko Document mein insert karein
+        add_flowchart(doc, flow_data)
+    except Exception as e:
+        doc.add_paragraph(f"{FLOWCHART_ERROR}: {str(e)}")
+    return doc
+
+def build_pdd_document(meta, section_content, flow_data, contacts, company, today=None):
+    with span("front_matter"):
+        doc = clone_front_matter(meta, contacts, company, today)
+    with span("body_docx", sections=len(section_content)):
+        return append_pdd_body(doc, section_content, flow_data)
+
+def build_and_save(output_path, meta, section_content, flow_data, contacts, company, today=None):
+    # top-level so it can be shipped to a ProcessPoolExecutor worker
+    doc = build_pdd_document(meta, section_content, flow_data, contacts, company, today)
+    doc.save(output_path)
+    return output_path
+
+def build_document_bytes(meta, section_content, flow_data, contacts, company, today=None):
+    # same, but hands the file back instead of writing it
+    return document_to_bytes(build_pdd_document(meta, section_content, flow_data, contacts, company, today))
+
+def generate_pdd(client, process_context, source_name=None, manual_text="", use_cache=True, config=None,
+                 mode=None):
+    branding, contacts, company, clients = config or load_config()
+    meta = resolve_document_meta(clients, branding, source_name, manual_text)
+    content = generate_llm_content(client, process_context, meta["title"], use_cache=use_cache, mode=mode)
+    doc = build_pdd_document(meta, content["sections"], content["flow_data"], contacts, company)
+    return doc, document_filename(meta["title"])
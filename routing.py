@@ -0,0 +1,52 @@
+"""Which Groq model answers each call, by task, prompt size and a latency/quality policy.
+
+    summary / merge / flow              8B, always
+    section:AUDIENCE, section:PURPOSE   8B when the prompt is small ("balanced")
+    other sections, structured          70B, or 8B under the "latency" policy
+
+Under "balanced" a 70B route keeps the 8B model as its fallback: it answers
+instead when the 70B rate budget would hold the request back for more than
+PDD_ROUTING_MAX_WAIT seconds, or when the 70B request is rate limited, fails
+or takes longer than PDD_ROUTING_TIMEOUT. The route taken is recorded on the
+call's trace span ("route", and "routed_from" when it fell back).
+
+    PDD_ROUTING_POLICY          "balanced" (default), "quality" or "latency"
+    PDD_ROUTING_SMALL_TOKENS    prompts up to this size are small (default 1500)
+    PDD_ROUTING_MAX_WAIT        seconds (default 5)
+    PDD_ROUTING_TIMEOUT         seconds (default 60)
+"""
+
+import os
+from collections import namedtuple
+
+FAST_MODEL = "llama-3.1-8b-instant"
+QUALITY_MODEL = "llama-3.3-70b-versatile"
+
+ROUTING_POLICIES = ["balanced", "quality", "latency"]
+ROUTING_POLICY = os.getenv("PDD_ROUTING_POLICY", "balanced")
+SMALL_PROMPT_TOKENS = int(os.getenv("PDD_ROUTING_SMALL_TOKENS", "1500"))
+ROUTING_MAX_WAIT_SECONDS = float(os.getenv("PDD_ROUTING_MAX_WAIT", "5"))
+ROUTING_TIMEOUT_SECONDS = float(os.getenv("PDD_ROUTING_TIMEOUT", "60"))
+
+FAST_TASKS = {"summary", "merge", "flow"}
+# a few lines each, whatever the size of the process
+SHORT_SECTIONS = {"AUDIENCE", "PURPOSE"}
+
+Route = namedtuple("Route", "model fallback reason")
+
+
+def choose_route(task, prompt_tokens, policy=None):
+    # task: "summary", "merge", "flow", "structured" or "section:<NAME>"
+    policy = policy or ROUTING_POLICY
+    if policy not in ROUTING_POLICIES:
+        raise ValueError(f"unknown routing policy {policy!r}, expected one of {ROUTING_POLICIES}")
+    if task in FAST_TASKS:
+        return Route(FAST_MODEL, None, task)
+    if policy == "latency":
+        return Route(FAST_MODEL, None, "latency policy")
+    if policy == "quality":
+        return Route(QUALITY_MODEL, None, "quality policy")
+    section = task.split(":", 1)[1] if task.startswith("section:") else None
+    if section in SHORT_SECTIONS and prompt_tokens <= SMALL_PROMPT_TOKENS:
+        return Route(FAST_MODEL, None, "short section")
+    return Route(QUALITY_MODEL, FAST_MODEL, "balanced")
@@ -0,0 +1,399 @@
+"""Shared scheduler for Groq chat completions: per-model rate budgets, retries, priorities.
+
+Every completion goes through RequestScheduler.run, which
+  * waits for room in the model's requests/min and tokens/min token buckets,
+  * serves interactive work before batch work when both are queued,
+  * retries 429 / 5xx / connection errors with exponential backoff and
+    full jitter, honouring Retry-After (and pausing the model for everyone).
+
+The bucket levels, 429 pauses and waiting priorities are kept in a small
+SQLite file (SharedBudget), so the Streamlit server and batch_generate.py
+processes on one machine draw on the same Groq quota and batch work yields
+to interactive work in the other process too. With PDD_SCHEDULER_PATH=""
+the budget is per process, and each process assumes it has the whole quota.
+
+Limits default to Groq's free tier and can be raised for paid plans with
+PDD_RATE_LIMITS, e.g. '{"llama-3.3-70b-versatile": {"rpm": 1000, "tpm": 300000}}'
+("*" sets the default for other models, 0 means unlimited).
+"""
+
+import heapq
+import itertools
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import groq
+
+DEFAULT_MODEL_LIMITS = {
+    "llama-3.1-8b-instant": {"rpm": 30, "tpm": 6000},
+    "llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12000},
+    "*": {"rpm": 30, "tpm": 6000},
+}
+MAX_RETRIES = int(os.getenv("PDD_MAX_RETRIES", "5"))
+BACKOFF_BASE_SECONDS = float(os.getenv("PDD_BACKOFF_BASE_SECONDS", "1.0"))
+BACKOFF_MAX_SECONDS = float(os.getenv("PDD_BACKOFF_MAX_SECONDS", "60"))
+# completion tokens reserved up front; corrected with the real usage afterwards
+EXPECTED_COMPLETION_TOKENS = 600
+SCHEDULER_PATH = os.getenv("PDD_SCHEDULER_PATH", os.path.join(".cache", "scheduler.sqlite3"))
+# other processes can't wake a waiter, so it looks at the shared budget this often
+SHARED_POLL_SECONDS = 0.5
+# a waiter in another process not seen for this long has gone away
+WAITER_TTL_SECONDS = 5.0
+
+# how often a waiting request checks whether its run was cancelled
+CANCEL_POLL_SECONDS = 0.5
+
+class RateBudgetExceeded(Exception):
+    # acquire(max_wait=...) would have had to wait longer than that
+    pass
+
+
+class GenerationCancelled(Exception):
+    # the run was cancelled: raised from an on_delta callback, or by the
+    # scheduler when should_cancel() turns true (re-exported by pipeline)
+    pass
+
+
+def check_cancelled(should_cancel):
+    if should_cancel and should_cancel():
+        raise GenerationCancelled()
+
+
+INTERACTIVE = 0
+BATCH = 10
+_priority = ContextVar("pdd_request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(level):
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def load_limits():
+    limits = {model: dict(values) for model, values in DEFAULT_MODEL_LIMITS.items()}
+    raw = os.getenv("PDD_RATE_LIMITS")
+    if raw:
+        for model, values in json.loads(raw).items():
+            limits.setdefault(model, {}).update(values)
+    return limits
+
+
+class TokenBucket:
+
+    def __init__(self, per_minute, now=None):
+        # per_minute <= 0 disables the bucket
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        # a request bigger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount):
+        if self.rate > 0:
+            self.level -= amount
+
+
+class _ModelLimiter:
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.requests = TokenBucket(limits.get("rpm", 0))
+        self.tokens = TokenBucket(limits.get("tpm", 0))
+        self.paused_until = 0.0
+        self.waiting = []   # heap of (priority, seq)
+
+    def take(self, tokens, now):
+        # seconds until one request of this size fits; 0.0 once it was taken
+        wait = max(self.paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+        if wait <= 0:
+            self.requests.consume(1)
+            self.tokens.consume(tokens)
+        return wait
+
+
+class SharedBudget:
+    # the _ModelLimiter state of every process on this machine, in SQLite;
+    # times are wall clock since monotonic clocks differ between processes
+
+    def __init__(self, path=SCHEDULER_PATH):
+        self.path = path
+        self.owner = os.getpid()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS budgets ("
+                " model TEXT PRIMARY KEY,"
+                " requests REAL NOT NULL,"
+                " tokens REAL NOT NULL,"
+                " updated REAL NOT NULL,"
+                " paused_until REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS waiters ("
+                " model TEXT NOT NULL,"
+                " owner INTEGER NOT NULL,"
+                " priority INTEGER NOT NULL,"
+                " seen REAL NOT NULL,"
+                " PRIMARY KEY (model, owner))"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE: read-modify-write of a budget by one process at a time
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _load(self, conn, model, limits, now):
+        requests = TokenBucket(limits.get("rpm", 0), now)
+        tokens = TokenBucket(limits.get("tpm", 0), now)
+        paused_until = 0.0
+        row = conn.execute("SELECT requests, tokens, updated, paused_until FROM budgets WHERE model = ?",
+                           (model,)).fetchone()
+        if row:
+            requests.level, tokens.level, updated, paused_until = row
+            requests.updated = tokens.updated = min(updated, now)
+            requests._refill(now)
+            tokens._refill(now)
+        return requests, tokens, paused_until
+
+    def _save(self, conn, model, requests, tokens, paused_until, now):
+        conn.execute("INSERT OR REPLACE INTO budgets (model, requests, tokens, updated, paused_until) "
+                     "VALUES (?, ?, ?, ?, ?)", (model, requests.level, tokens.level, now, paused_until))
+
+    def take(self, model, limits, tokens, priority):
+        # same as _ModelLimiter.take, and also waits while a more urgent
+        # request for this model is waiting in another process
+        now = time.time()
+        with self._transaction() as conn:
+            requests, token_bucket, paused_until = self._load(conn, model, limits, now)
+            wait = max(paused_until - now, requests.wait_time(1, now), token_bucket.wait_time(tokens, now))
+            ahead = conn.execute(
+                "SELECT 1 FROM waiters WHERE model = ? AND owner != ? AND priority < ? AND seen > ?",
+                (model, self.owner, priority, now - WAITER_TTL_SECONDS),
+            ).fetchone()
+            if ahead:
+                wait = max(wait, SHARED_POLL_SECONDS)
+            if wait <= 0:
+                requests.consume(1)
+                token_bucket.consume(tokens)
+            self._save(conn, model, requests, token_bucket, paused_until, now)
+        return wait
+
+    def adjust(self, model, limits, tokens):
+        now = time.time()
+        with self._transaction() as conn:
+            requests, token_bucket, paused_until = self._load(conn, model, limits, now)
+            token_bucket.consume(tokens)
+            self._save(conn, model, requests, token_bucket, paused_until, now)
+
+    def pause(self, model, limits, seconds):
+        now = time.time()
+        with self._transaction() as conn:
+            requests, token_bucket, paused_until = self._load(conn, model, limits, now)
+            self._save(conn, model, requests, token_bucket, max(paused_until, now + seconds), now)
+
+    def announce(self, model, priority):
+        # this process has a request for model waiting at this priority
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO waiters (model, owner, priority, seen) VALUES (?, ?, ?, ?)",
+                         (model, self.owner, priority, time.time()))
+
+    def withdraw(self, model):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM waiters WHERE model = ? AND owner = ?", (model, self.owner))
+
+
+def is_retryable(error):
+    if isinstance(error, (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)):
+        return True
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RequestScheduler:
+
+    def __init__(self, limits=None, max_retries=MAX_RETRIES,
+                 base_delay=BACKOFF_BASE_SECONDS, max_delay=BACKOFF_MAX_SECONDS, shared=None):
+        # shared: a SharedBudget used instead of this process' own buckets
+        self.limits = limits if limits is not None else load_limits()
+        self.shared = shared
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._models = {}
+        self._seq = itertools.count()
+
+    def _limiter(self, model):
+        limiter = self._models.get(model)
+        if limiter is None:
+            limiter = _ModelLimiter(self.limits.get(model, self.limits.get("*", {})))
+            self._models[model] = limiter
+        return limiter
+
+    def acquire(self, model, tokens, priority=None, max_wait=None, should_cancel=None):
+        # max_wait: raise RateBudgetExceeded rather than wait longer than this;
+        # should_cancel: raise GenerationCancelled as soon as it returns true
+        priority = _priority.get() if priority is None else priority
+        ticket = (priority, next(self._seq))
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        with self._cond:
+            limiter = self._limiter(model)
+            heapq.heappush(limiter.waiting, ticket)
+            self._cond.notify_all()
+            try:
+                while True:
+                    check_cancelled(should_cancel)
+                    now = time.monotonic()
+                    # only the most urgent waiter for this model may take budget
+                    wait = None
+                    if limiter.waiting[0] == ticket:
+                        if self.shared is None:
+                            wait = limiter.take(tokens, now)
+                        else:
+                            wait = self.shared.take(model, limiter.limits, tokens, priority)
+                        if wait <= 0:
+                            return
+                        if self.shared is not None:
+                            self.shared.announce(model, priority)
+                    if deadline is not None:
+                        if now + (wait or 0) > deadline or now >= deadline:
+                            raise RateBudgetExceeded(f"{model} has no budget for {max_wait:g}s")
+                        wait = min(wait, deadline - now) if wait is not None else deadline - now
+                    if self.shared is not None:
+                        wait = SHARED_POLL_SECONDS if wait is None else min(wait, SHARED_POLL_SECONDS)
+                    if should_cancel is not None:
+                        wait = CANCEL_POLL_SECONDS if wait is None else min(wait, CANCEL_POLL_SECONDS)
+                    self._cond.wait(wait)
+            finally:
+                limiter.waiting.remove(ticket)
+                heapq.heapify(limiter.waiting)
+                if self.shared is not None and not limiter.waiting:
+                    self.shared.withdraw(model)
+                self._cond.notify_all()
+
+    def settle(self, model, reserved, used):
+        # swap the up-front reservation for the real token usage
+        if used is None:
+            return
+        with self._cond:
+            limiter = self._limiter(model)
+            if self.shared is None:
+                limiter.tokens.consume(used - reserved)
+            else:
+                self.shared.adjust(model, limiter.limits, used - reserved)
+
+    def pause(self, model, seconds):
+        with self._cond:
+            limiter = self._limiter(model)
+            if self.shared is None:
+                limiter.paused_until = max(limiter.paused_until, time.monotonic() + seconds)
+            else:
+                self.shared.pause(model, limiter.limits, seconds)
+            self._cond.notify_all()
+
+    def backoff_delay(self, attempt, error):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, self.base_delay)
+        return min(delay, self.max_delay)
+
+    def run(self, call, model, prompt_tokens, priority=None, on_retry=None, max_retries=None, max_wait=None,
+            should_cancel=None):
+        # returns (result, retries); re-raises once retries are exhausted
+        max_retries = self.max_retries if max_retries is None else max_retries
+        reserved = prompt_tokens + EXPECTED_COMPLETION_TOKENS
+        attempt = 0
+        while True:
+            self.acquire(model, reserved, priority, max_wait, should_cancel)
+            try:
+                result = call()
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                if isinstance(e, groq.RateLimitError):
+                    # the quota is shared: hold back every caller of this model,
+                    # also when this one gives up (routing.py then goes elsewhere)
+                    self.pause(model, delay)
+                if attempt >= max_retries:
+                    raise
+                attempt += 1
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                # back off in slices, so a cancelled run stops waiting
+                deadline = time.monotonic() + delay
+                while time.monotonic() < deadline:
+                    check_cancelled(should_cancel)
+                    time.sleep(min(CANCEL_POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+                continue
+            usage = getattr(result, "usage", None)
+            self.settle(model, reserved, getattr(usage, "total_tokens", None))
+            return result, attempt
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            shared = None
+            if SCHEDULER_PATH:
+                try:
+                    shared = SharedBudget()
+                except (OSError, sqlite3.Error):
+                    shared = None   # e.g. read-only working directory: budget per process
+            _scheduler = RequestScheduler(shared=shared)
+        return _scheduler
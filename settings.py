@@ -0,0 +1,15 @@
+"""Settings the Streamlit page needs before anything is generated.
+
+Kept free of heavy imports so app.py can render without loading groq,
+pandas, python-docx or graphviz; pipeline.py re-exports these names.
+"""
+
+import os
+
+PDD_SECTIONS = ["INTRODUCTION", "AUDIENCE", "PURPOSE", "SCOPE"]
+# GENERATION MODE: "per_section" (one call per section + flow call) or
+# "structured" (everything in a single JSON response)
+GENERATION_MODES = ["per_section", "structured"]
+GENERATION_MODE = os.getenv("PDD_GENERATION_MODE", "per_section")
+# INPUT SIZE LIMIT (characters read from an upload or typed in)
+MAX_INPUT_CHARS = int(os.getenv("PDD_MAX_INPUT_CHARS", "500000"))
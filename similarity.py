@@ -0,0 +1,228 @@
+"""Near-duplicate lookup of earlier inputs, so similar documents reuse earlier work.
+
+Every finished generation is recorded with a MinHash signature of its input
+(word 5-gram shingles, 128 hash functions) and what was generated from it:
+short_context, section texts, flow JSON and the per-chunk summaries.
+Signatures are split into 16 LSH bands of 8 rows; stored documents sharing a
+band bucket with the new input are candidates, and the best candidate whose
+estimated Jaccard similarity reaches the threshold is offered to the user.
+Everything lives in one local SQLite file, no external service.
+
+    PDD_SIMILARITY_PATH        index file ("" turns the index off)
+    PDD_SIMILARITY_THRESHOLD   minimum similarity to offer a match (default 0.8)
+    PDD_SIMILARITY_MAX_DOCS    documents kept, oldest dropped first (default 500)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+SIMILARITY_PATH = os.getenv("PDD_SIMILARITY_PATH", os.path.join(".cache", "similarity.sqlite3"))
+SIMILARITY_THRESHOLD = float(os.getenv("PDD_SIMILARITY_THRESHOLD", "0.8"))
+SIMILARITY_MAX_DOCS = int(os.getenv("PDD_SIMILARITY_MAX_DOCS", "500"))
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 16              # 16 x 8 rows: candidates from roughly 0.7 similarity up
+ROWS = NUM_PERM // BANDS
+HASH_BLOCK = 4096       # shingles hashed per numpy block
+LOOKUP_MEMO_SIZE = 16
+
+# what to do with a near-duplicate
+REUSE = "reuse"         # take its summary, sections and flow as they are
+REFRESH = "refresh"     # re-summarize only the chunks that differ
+FRESH = "fresh"         # ignore it
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# fixed seed: signatures are compared across processes and restarts
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, _MERSENNE, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, _MERSENNE, size=NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text):
+    # MinHash signature (NUM_PERM uint64 values), None for text without words
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+    if not len(hashes):
+        return None
+    sig = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), HASH_BLOCK):
+        block = hashes[start:start + HASH_BLOCK, None]
+        # uint64 products wrap around, which is fine for a hash family
+        permuted = ((block * _PERM_A + _PERM_B) % _MERSENNE) & _MAX_HASH
+        np.minimum(sig, permuted.min(axis=0), out=sig)
+    return sig
+
+
+def similarity(sig_a, sig_b):
+    # estimated Jaccard similarity of the two shingle sets
+    return float(np.mean(sig_a == sig_b))
+
+
+def band_buckets(sig):
+    buckets = []
+    for band in range(BANDS):
+        rows = sig[band * ROWS:(band + 1) * ROWS].tobytes()
+        bucket = int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), "big", signed=True)
+        buckets.append((band, bucket))
+    return buckets
+
+
+class SimilarityIndex:
+
+    def __init__(self, path=SIMILARITY_PATH, threshold=SIMILARITY_THRESHOLD, max_docs=SIMILARITY_MAX_DOCS):
+        self.path = path
+        self.threshold = threshold
+        self.max_docs = max_docs
+        self._lock = threading.Lock()
+        self._memo = OrderedDict()  # input hash -> find() result, until the next add()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " id INTEGER PRIMARY KEY,"
+                " input_hash TEXT UNIQUE NOT NULL,"
+                " title TEXT NOT NULL,"
+                " signature BLOB NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                " band INTEGER NOT NULL,"
+                " bucket INTEGER NOT NULL,"
+                " doc_id INTEGER NOT NULL,"
+                " PRIMARY KEY (band, bucket, doc_id)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_doc ON bands(doc_id)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def input_hash(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def add(self, text, title, content, chunk_summaries):
+        # content: generate_llm_content result for text, generated under title
+        sig = signature(text)
+        if sig is None:
+            return
+        payload = json.dumps({
+            "title": title,
+            "short_context": content["short_context"],
+            "sections": content["sections"],
+            "flow_data": content["flow_data"],
+            "chunk_summaries": chunk_summaries,
+        }, ensure_ascii=False)
+        with self._lock, self._connect() as conn:
+            old = conn.execute("SELECT id FROM documents WHERE input_hash = ?", (self.input_hash(text),)).fetchone()
+            if old:
+                self._delete(conn, old[0])
+            doc_id = conn.execute(
+                "INSERT INTO documents (input_hash, title, signature, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.input_hash(text), title, sig.tobytes(), payload, time.time()),
+            ).lastrowid
+            conn.executemany("INSERT OR IGNORE INTO bands (band, bucket, doc_id) VALUES (?, ?, ?)",
+                             [(band, bucket, doc_id) for band, bucket in band_buckets(sig)])
+            self._prune(conn)
+            self._memo.clear()
+
+    def find(self, text):
+        # best stored match at or above the threshold, or None:
+        # {"similarity", "title", "created_at", "short_context", "sections", "flow_data", "chunk_summaries"}
+        key = self.input_hash(text)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        match = self._lookup(text)
+        with self._lock:
+            self._memo[key] = match
+            while len(self._memo) > LOOKUP_MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return match
+
+    def _lookup(self, text):
+        sig = signature(text)
+        if sig is None:
+            return None
+        with self._connect() as conn:
+            candidates = set()
+            for band, bucket in band_buckets(sig):
+                rows = conn.execute("SELECT doc_id FROM bands WHERE band = ? AND bucket = ?", (band, bucket))
+                candidates.update(doc_id for doc_id, in rows)
+            best, best_score = None, self.threshold
+            for doc_id in candidates:
+                row = conn.execute("SELECT signature FROM documents WHERE id = ?", (doc_id,)).fetchone()
+                if row is None:
+                    continue
+                score = similarity(sig, np.frombuffer(row[0], dtype=np.uint64))
+                if score >= best_score:
+                    best, best_score = doc_id, score
+            if best is None:
+                return None
+            payload, created_at = conn.execute(
+                "SELECT payload, created_at FROM documents WHERE id = ?", (best,)).fetchone()
+        match = json.loads(payload)
+        match.update(similarity=best_score, created_at=created_at)
+        return match
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM bands")
+            conn.execute("DELETE FROM documents")
+            self._memo.clear()
+
+    def _delete(self, conn, doc_id):
+        conn.execute("DELETE FROM bands WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def _prune(self, conn):
+        if not self.max_docs:
+            return
+        stale = conn.execute("SELECT id FROM documents ORDER BY created_at DESC LIMIT -1 OFFSET ?",
+                             (self.max_docs,)).fetchall()
+        for doc_id, in stale:
+            self._delete(conn, doc_id)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    # None when PDD_SIMILARITY_PATH is set to ""
+    global _index
+    if not SIMILARITY_PATH:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex()
+        return _index
@@ -0,0 +1,71 @@
+"""Prebuilt per-client document skeletons (cover, header, contents, version history).
+
+A skeleton is the front matter rendered once with placeholder title and
+date. Each generation clones it and swaps the placeholders in, instead of
+rebuilding the tables, fields and logo/banner pictures from scratch.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+
+from assets import ASSET_VERSION, IMAGE_DPI, JPEG_QUALITY
+from cache_store import CacheStore
+
+TITLE_PLACEHOLDER = "{{PDD_TITLE}}"
+DATE_PLACEHOLDER = "{{PDD_DATE}}"
+_PLACEHOLDER_RE = re.compile(r"\{\{PDD_[A-Z]+\}\}")
+
+# bump when the front matter layout in pipeline.build_front_matter changes,
+# so skeletons compiled by an older version are not reused
+SKELETON_VERSION = 2
+SKELETON_CACHE_SIZE = int(os.getenv("PDD_SKELETON_CACHE_SIZE", "32"))
+SKELETON_CACHE_DIR = os.getenv("PDD_SKELETON_CACHE_DIR", os.path.join(".cache", "skeletons"))
+
+_cache = CacheStore(SKELETON_CACHE_SIZE, SKELETON_CACHE_DIR, suffix=".docx")
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def skeleton_key(meta, contacts, company):
+    # everything that ends up in the front matter except title and date
+    payload = {
+        "version": SKELETON_VERSION,
+        "client_cfg": meta["client_cfg"],
+        "logo": [meta["logo_path"], _file_signature(meta["logo_path"])],
+        "banner": [meta["banner_path"], _file_signature(meta["banner_path"])],
+        "images": [ASSET_VERSION, IMAGE_DPI, JPEG_QUALITY],
+        "contacts": contacts,
+        "company": company,
+    }
+    canonical = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def get_skeleton(key, build):
+    # build() must return the skeleton as .docx bytes
+    return _cache.get_or_build(key, build)
+
+
+def fill_placeholders(doc, values):
+    # placeholders are always written as part of a single run, so replacing
+    # inside each w:t keeps the formatting of the surrounding text
+    parts = [doc.part] + [
+        rel.target_part for rel in doc.part.rels.values()
+        if rel.reltype in (RT.HEADER, RT.FOOTER)
+    ]
+    replace = lambda match: values.get(match.group(0), match.group(0))
+    for part in parts:
+        for text in part.element.iter(qn("w:t")):
+            if text.text and "{{PDD_" in text.text:
+                text.text = _PLACEHOLDER_RE.sub(replace, text.text)
@@ -0,0 +1,19 @@
+import json
+import os
+import sys
+import tempfile
+
+# the modules live at the top of the repository, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# keep the shared caches and the scheduler file out of the working directory;
+# read at import time, so set before any test module imports them
+_cache_dir = tempfile.mkdtemp(prefix="pdd-tests-")
+os.environ.setdefault("PDD_CACHE_PATH", os.path.join(_cache_dir, "llm_cache.sqlite3"))
+os.environ.setdefault("PDD_SCHEDULER_PATH", "")
+os.environ.setdefault("PDD_SIMILARITY_PATH", "")
+# fake clients answer at once; Groq's free-tier limits would only slow the tests down
+os.environ.setdefault("PDD_RATE_LIMITS", json.dumps(
+    {model: {"rpm": 0, "tpm": 0} for model in ("*", "llama-3.1-8b-instant", "llama-3.3-70b-versatile")}))
+for name in ("PDD_ASSET_CACHE_DIR", "PDD_FLOWCHART_CACHE_DIR", "PDD_SKELETON_CACHE_DIR"):
+    os.environ.setdefault(name, "")
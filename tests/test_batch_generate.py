@@ -0,0 +1,31 @@
+import os
+
+from batch_generate import find_inputs, output_paths
+
+CONFIG = ({}, {}, {}, {"ACME": {}})
+
+
+def make_inputs(root, names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("Receive the invoice.", encoding="utf-8")
+    return find_inputs(str(root), recursive=True)
+
+
+def test_same_names_get_a_suffix(tmp_path):
+    inputs = make_inputs(tmp_path / "in", ["invoice.docx", "invoice.txt", "my-invoice.txt", "my_invoice.txt"])
+    outputs = output_paths(inputs, str(tmp_path / "in"), str(tmp_path / "out"), CONFIG)
+    assert sorted(os.path.basename(path) for path in outputs.values()) == [
+        "KMG_PDD_Invoice.docx", "KMG_PDD_Invoice_2.docx", "KMG_PDD_My_Invoice.docx", "KMG_PDD_My_Invoice_2.docx",
+    ]
+
+
+def test_sub_folders_are_mirrored(tmp_path):
+    inputs = make_inputs(tmp_path / "in", ["invoice.txt", "emea/invoice.txt", "emea/uk/invoice.txt"])
+    outputs = output_paths(inputs, str(tmp_path / "in"), str(tmp_path / "out"), CONFIG)
+    assert sorted(os.path.relpath(path, tmp_path / "out") for path in outputs.values()) == [
+        "KMG_PDD_Invoice.docx",
+        os.path.join("emea", "KMG_PDD_Invoice.docx"),
+        os.path.join("emea", "uk", "KMG_PDD_Invoice.docx"),
+    ]
@@ -0,0 +1,63 @@
+import io
+
+from docx import Document
+
+from extract import extract_text
+
+
+def docx_upload():
+    doc = Document()
+    doc.add_paragraph("Invoice handling")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Step"
+    table.cell(0, 1).text = "Owner"
+    table.cell(1, 0).text = "Approve"
+    cell = table.cell(1, 1)
+    cell.text = "Finance"
+    nested = cell.add_table(rows=1, cols=2)
+    nested.cell(0, 0).text = "AP clerk"
+    nested.cell(0, 1).text = "Controller"
+    doc.add_paragraph("Archive the invoice.")
+    buf = io.BytesIO()
+    doc.save(buf)
+    buf.seek(0)
+    buf.name = "process.docx"
+    return buf
+
+
+def test_docx_tables_become_lines():
+    text, truncated = extract_text(docx_upload(), memoize=False)
+    assert text == ("Invoice handling\n"
+                    "Step | Owner\n"
+                    "Approve | Finance AP clerk | Controller\n"
+                    "Archive the invoice.")
+    assert truncated is False
+
+
+def test_docx_budget_cut_off():
+    upload = docx_upload()
+    text, truncated = extract_text(upload, max_chars=30, memoize=False)
+    assert text == "Invoice handling\nStep | Owner"
+    assert truncated is True
+    # the upload can be read again
+    assert upload.tell() == 0
+
+
+def test_budget_cuts_inside_a_line():
+    upload = io.BytesIO("first line\nsecond line".encode("utf-8"))
+    text, truncated = extract_text(upload, name="process.txt", max_chars=15, memoize=False)
+    assert text == "first line\nseco"
+    assert truncated is True
+
+
+def test_text_file(tmp_path):
+    path = tmp_path / "process.txt"
+    path.write_bytes("\ufeffReceive request\nCheck request\n".encode("utf-8"))
+    assert extract_text(str(path), max_chars=None) == ("Receive request\nCheck request", False)
+
+
+def test_memoized_by_content():
+    first = extract_text(docx_upload())
+    assert extract_text(docx_upload()) == first
+    # a different budget is a different result
+    assert extract_text(docx_upload(), max_chars=30) != first
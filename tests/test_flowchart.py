@@ -0,0 +1,30 @@
+from flowchart import flowchart_layout
+
+
+def flow(node_count, edges):
+    return {"nodes": [{"id": str(i), "label": f"Step {i}", "type": "action"} for i in range(node_count)],
+            "edges": [{"from": str(a), "to": str(b), "label": ""} for a, b in edges]}
+
+
+def chain(node_count):
+    return [(i, i + 1) for i in range(node_count - 1)]
+
+
+def test_small_sparse_flow_is_square():
+    attrs, box = flowchart_layout(flow(8, chain(8)))
+    assert attrs["size"] == "7,7!"
+    assert box == (5.0, 5.0)
+
+
+def test_many_nodes_get_the_bigger_box():
+    attrs, box = flowchart_layout(flow(20, chain(20)))
+    assert attrs["size"] == "7,9!"
+    assert box == (6.5, 8.4)
+
+
+def test_dense_flow_gets_the_bigger_box():
+    # few steps, but every one branches back to all the earlier ones
+    edges = chain(8) + [(a, b) for a in range(8) for b in range(a) if b != a - 1][:12]
+    attrs, box = flowchart_layout(flow(8, edges))
+    assert attrs["size"] == "7,9!"
+    assert box == (6.5, 8.4)
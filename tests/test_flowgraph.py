@@ -0,0 +1,118 @@
+from flowgraph import merge_flow_patch, normalize_flow
+
+
+def ids(flow):
+    return [node["id"] for node in flow["nodes"]]
+
+
+def types(flow):
+    return {node["id"]: node["type"] for node in flow["nodes"]}
+
+
+def test_duplicate_ids():
+    # the same step listed twice is kept once; a different step under a used id is renamed
+    flow, problems = normalize_flow({
+        "nodes": [
+            {"id": "1", "label": "Receive request"},
+            {"id": "1", "label": "Receive request"},
+            {"id": "2", "label": "Check request"},
+            {"id": "2", "label": "Approve request"},
+        ],
+        "edges": [{"from": "1", "to": "2"}, {"from": "2", "to": "2_2"}],
+    })
+    assert ids(flow) == ["1", "2", "2_2"]
+    assert [node["label"] for node in flow["nodes"]] == ["Receive request", "Check request", "Approve request"]
+    assert problems == []
+
+
+def test_ids_with_colons_and_numbers():
+    # ":" would be read by graphviz as a port
+    flow, problems = normalize_flow({
+        "nodes": [{"id": "a:1", "label": "Receive"}, {"id": 2.0, "label": "File"}],
+        "edges": [{"from": "a:1", "to": 2}],
+    })
+    assert ids(flow) == ["a_1", "2"]
+    assert flow["edges"] == [{"from": "a_1", "to": "2", "label": ""}]
+    assert problems == []
+
+
+def test_edges_matched_by_label():
+    flow, problems = normalize_flow({
+        "nodes": [{"id": "1", "label": "Receive"}, {"id": "2", "label": "File"}],
+        "edges": [{"source": "receive", "target": "File"}],
+    })
+    assert flow["edges"] == [{"from": "1", "to": "2", "label": ""}]
+    assert problems == []
+
+
+def test_dangling_edge_is_dropped_and_reported():
+    flow, problems = normalize_flow({
+        "nodes": [{"id": "1", "label": "Receive"}, {"id": "2", "label": "File"}],
+        "edges": [{"from": "1", "to": "2"}, {"from": "2", "to": "9"}],
+    })
+    assert flow["edges"] == [{"from": "1", "to": "2", "label": ""}]
+    assert problems == ['step 2 "File" leads to step "9", which is not in the list']
+
+
+def test_decision_with_one_branch():
+    flow, problems = normalize_flow({
+        "nodes": [
+            {"id": "1", "label": "Receive"},
+            {"id": "2", "label": "Complete?", "type": "decision"},
+            {"id": "3", "label": "File"},
+        ],
+        "edges": [{"from": "1", "to": "2"}, {"from": "2", "to": "3", "label": "Yes"}],
+    })
+    assert types(flow)["2"] == "decision"
+    assert len(problems) == 1
+    assert problems[0].startswith('decision step 2 "Complete?" has 1 outgoing edge(s)')
+
+
+def test_flow_without_edges_is_read_in_order():
+    flow, problems = normalize_flow({"steps": ["Receive request", "Check request", "Archive"]})
+    assert flow["edges"] == [
+        {"from": "n1", "to": "n2", "label": ""},
+        {"from": "n2", "to": "n3", "label": ""},
+    ]
+    assert types(flow) == {"n1": "start", "n2": "action", "n3": "end"}
+    assert problems == []
+
+
+def test_flow_without_steps():
+    assert normalize_flow({"nodes": [], "edges": []}) == (None, ["the flow has no steps"])
+    assert normalize_flow("not a flow") == (None, ["the flow has no steps"])
+
+
+def test_unconnected_step():
+    flow, problems = normalize_flow({
+        "nodes": [{"id": "1", "label": "Receive"}, {"id": "2", "label": "File"}, {"id": "3", "label": "Notify"}],
+        "edges": [{"from": "1", "to": "2"}],
+    })
+    assert problems == ['step 3 "Notify" is not connected to any other step']
+
+
+def test_merge_flow_patch():
+    flow, problems = normalize_flow({
+        "nodes": [
+            {"id": "1", "label": "Receive"},
+            {"id": "2", "label": "Complete?", "type": "decision"},
+            {"id": "3", "label": "File"},
+        ],
+        "edges": [{"from": "1", "to": "2"}, {"from": "2", "to": "3", "label": "Yes"}],
+    })
+    assert problems
+    patch = {
+        "nodes": [{"id": "3", "label": "File the request"}, {"id": "4", "label": "Ask for the missing data"}],
+        "edges": [{"from": "2", "to": "4", "label": "No"}, {"from": "4", "to": "1"}],
+    }
+    merged = merge_flow_patch(flow, patch)
+    assert ids(merged) == ["1", "2", "3", "4"]
+    assert merged["nodes"][2]["label"] == "File the request"
+    assert merged["edges"][-2:] == patch["edges"]
+    # the flow it was patched from is left alone
+    assert flow["nodes"][2]["label"] == "File"
+    assert len(flow["edges"]) == 2
+
+    repaired, problems = normalize_flow(merged)
+    assert problems == []
+    assert types(repaired)["2"] == "decision"
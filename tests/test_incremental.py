@@ -0,0 +1,57 @@
+import json
+import types
+
+from incremental import RECOMPUTED, REUSED, IncrementalSession
+from pipeline import build_section_prompt
+
+PROCESS = "Receive the invoice.\nCheck it against the purchase order.\nFile the invoice."
+FLOW = {"nodes": [{"id": "1", "label": "Receive invoice", "type": "action"},
+                  {"id": "2", "label": "File invoice", "type": "action"}],
+        "edges": [{"from": "1", "to": "2", "label": ""}]}
+
+
+class RecordingClient:
+    # Groq stand-in answering flow JSON or text; keeps the prompts it was sent
+
+    def __init__(self):
+        self.prompts = []
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, messages, model, response_format=None, **params):
+        self.prompts.append(messages[0]["content"])
+        content = json.dumps(FLOW) if response_format else f"Answer {len(self.prompts)}."
+        message = types.SimpleNamespace(role="assistant", content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def test_same_input_reuses_every_stage():
+    client, session = RecordingClient(), IncrementalSession()
+    first = session.generate_llm_content(client, PROCESS, "Invoice approval", use_cache=False, mode="per_section")
+    sent = len(client.prompts)
+    second = session.generate_llm_content(client, PROCESS, "Invoice approval", use_cache=False, mode="per_section")
+    assert len(client.prompts) == sent
+    assert second == first
+    assert set(session.last_run.values()) == {REUSED}
+
+
+def test_title_edit_reasks_only_the_sections_naming_it():
+    client, session = RecordingClient(), IncrementalSession()
+    first = session.generate_llm_content(client, PROCESS, "Invoice approval", use_cache=False, mode="per_section")
+    client.prompts.clear()
+    second = session.generate_llm_content(client, PROCESS, "Invoice posting", use_cache=False, mode="per_section")
+
+    short_context = first["short_context"]
+    assert sorted(client.prompts) == sorted(build_section_prompt(name, short_context, "Invoice posting")
+                                            for name in ["INTRODUCTION", "SCOPE"])
+    assert session.last_run == {
+        "summary": REUSED,
+        "section INTRODUCTION": RECOMPUTED,
+        "section AUDIENCE": REUSED,
+        "section PURPOSE": REUSED,
+        "section SCOPE": RECOMPUTED,
+        "flow": REUSED,
+    }
+    assert second["sections"]["AUDIENCE"] == first["sections"]["AUDIENCE"]
+    assert second["sections"]["SCOPE"] != first["sections"]["SCOPE"]
+    assert session.summary_line() == ("Reused: summary, section AUDIENCE, section PURPOSE, flow | "
+                                      "Regenerated: section INTRODUCTION, section SCOPE")
@@ -0,0 +1,31 @@
+import time
+
+from incremental import IncrementalSession
+from jobs import CANCELLED, DONE, JobQueue, run_generation
+from test_pipeline import BlockingClient
+
+
+def wait_until_finished(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job.active and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def test_cancelled_job_frees_its_worker():
+    # one worker: the second job only runs once the first has let go of it
+    queue = JobQueue(workers=1)
+    client = BlockingClient()
+    meta = {"title": "Invoices"}
+    first = queue.submit("session", "Invoices", lambda job: run_generation(
+        job, IncrementalSession(), client, "Receive and file invoices.", meta, {}, {}, use_cache=False))
+    second = queue.submit("session", "Other", lambda job: None)
+    try:
+        assert client.started.wait(5)
+        cancelled_at = time.monotonic()
+        first.cancel()
+        wait_until_finished(second)
+        assert first.status == CANCELLED
+        assert second.status == DONE
+        assert time.monotonic() - cancelled_at < 3
+    finally:
+        client.release.set()
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+from llm_cache import LLMCache
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_put_and_get(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm_cache.sqlite3"))
+    key = LLMCache.make_key("model", "prompt", temperature=0)
+    assert cache.get(key) is None
+    cache.put(key, "answer")
+    assert cache.get(key) == "answer"
+    assert key != LLMCache.make_key("model", "prompt", temperature=1)
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm_cache.sqlite3"), ttl_seconds=-1)
+    cache.put("key", "answer")
+    assert cache.get("key") is None
+
+
+def test_importing_pipeline_creates_no_files(tmp_path):
+    env = {key: value for key, value in os.environ.items() if not key.startswith("PDD_")}
+    subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {REPO!r}); import pipeline, jobs"],
+                   cwd=tmp_path, env=env, check=True)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,303 @@
+import json
+import random
+import threading
+import time
+import types
+
+import pytest
+from docx import Document
+
+import pipeline
+from benchmarks.bench_section_writer import legacy_write, synthetic_section
+from pipeline import (
+    CHARS_PER_TOKEN,
+    GenerationCancelled,
+    SectionBlockWriter,
+    SectionGenerationError,
+    TokenBudgetExceeded,
+    build_section_prompt,
+    compact_prompt,
+    estimate_tokens,
+    generate_all_content,
+    generate_structured_content,
+    get_short_context,
+    get_smart_flow_data,
+    routed_completion,
+    split_into_chunks,
+    token_budget,
+    validate_structured_content,
+)
+
+WORDS = "invoice vendor approval ledger clerk matrix posting review payment release check record".split()
+
+
+def process_lines(count, seed=7):
+    rng = random.Random(seed)
+    return [f"{i}. " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))) for i in range(count)]
+
+
+def test_short_text_is_one_chunk():
+    assert split_into_chunks("Receive the invoice.\nCheck it.", max_tokens=500) == ["Receive the invoice.\nCheck it."]
+
+
+def test_chunks_keep_whole_lines_within_budget():
+    lines = process_lines(3000)
+    text = "\n".join(lines)
+    chunks = split_into_chunks(text, max_tokens=500)
+    assert len(chunks) > 10
+    assert all(len(chunk) <= 500 * CHARS_PER_TOKEN for chunk in chunks)
+    assert "\n".join(chunks) == text
+
+
+def test_long_line_is_cut():
+    text = "x" * 5000
+    chunks = split_into_chunks(text, max_tokens=500)
+    assert chunks == ["x" * 2000, "x" * 2000, "x" * 1000]
+
+
+def test_local_edit_keeps_other_boundaries():
+    lines = process_lines(3000)
+    before = split_into_chunks("\n".join(lines), max_tokens=500)
+    edited = list(lines)
+    edited[1500] += " urgent"
+    after = split_into_chunks("\n".join(edited), max_tokens=500)
+    # only the chunk holding the edited line changes
+    assert len(set(before) - set(after)) == 1
+    assert len(set(after) - set(before)) == 1
+
+
+def test_inserted_line_does_not_shift_later_chunks():
+    lines = process_lines(3000)
+    before = split_into_chunks("\n".join(lines), max_tokens=500)
+    after = split_into_chunks("\n".join(["A new first line about the process"] + lines), max_tokens=500)
+    assert len(set(before) - set(after)) <= 2
+    assert before[-1] == after[-1]
+
+
+def test_chunk_summaries_reused_after_an_edit(monkeypatch):
+    prompts = []
+
+    def fake_completion(client, prompt, task, use_cache=True, should_cancel=None, **params):
+        prompts.append((task, prompt))
+        return f"summary {len(prompts)}"
+
+    monkeypatch.setattr(pipeline, "routed_completion", fake_completion)
+    lines = process_lines(3000)
+    memo = {}
+    get_short_context(object(), "\n".join(lines), use_cache=False, chunk_memo=memo)
+    first_chunks = [prompt for task, prompt in prompts if task == "summary"]
+    assert len(first_chunks) == len(memo) > 1
+
+    # new steps put in front move every chunk a few places on; the prompt of
+    # a chunk doesn't say where it is, so a memoized summary is still the
+    # answer to it and only the new chunks are sent
+    edited = "\n".join(process_lines(300, seed=11) + lines)
+    new_chunks = set(split_into_chunks(edited)) - set(split_into_chunks("\n".join(lines)))
+    assert len(split_into_chunks(edited)) > len(first_chunks)
+    prompts.clear()
+    get_short_context(object(), edited, use_cache=False)
+    assert len(set(prompt for task, prompt in prompts if task == "summary") - set(first_chunks)) == len(new_chunks)
+    prompts.clear()
+    get_short_context(object(), edited, use_cache=False, chunk_memo=memo)
+    assert len([task for task, prompt in prompts if task == "summary"]) == len(new_chunks)
+
+
+def body_xml(anchor_text, writer, content):
+    doc = Document()
+    anchor = doc.add_paragraph(anchor_text)
+    writer(doc, anchor, content)
+    return doc.element.body.xml
+
+
+def test_section_writer_matches_old_loop():
+    content = synthetic_section(200) + "\n\n  Out of scope  \nOUT OF SCOPE\nA closing sentence."
+    legacy = body_xml("SCOPE", lambda doc, anchor, text: legacy_write(doc, text), content)
+    builder = body_xml("SCOPE", lambda doc, anchor, text: SectionBlockWriter(doc, anchor).write(text), content)
+    assert builder == legacy
+
+
+def test_section_writer_skips_scope_line_repeating_the_anchor():
+    content = "In scope\nVendor master data checks"
+    legacy = body_xml("In Scope", lambda doc, anchor, text: legacy_write(doc, text), content)
+    builder = body_xml("In Scope", lambda doc, anchor, text: SectionBlockWriter(doc, anchor).write(text), content)
+    assert builder == legacy
+    assert builder.count("In Scope") == 1
+
+
+class BlockingClient:
+    # Groq stand-in whose calls (all, or only the flow JSON ones) hang until released
+
+    def __init__(self, block_all=False):
+        self.block_all = block_all
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, messages, model, response_format=None, stream=False, **params):
+        self.calls += 1
+        if self.block_all or response_format:
+            self.started.set()
+            self.release.wait(10)
+        content = json.dumps({"nodes": ["Start", "End"]}) if response_format else "Section text."
+        if stream:
+            delta = types.SimpleNamespace(content=content)
+            return iter([types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)], usage=None)])
+        message = types.SimpleNamespace(role="assistant", content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def cancel_when_started(client):
+    cancelled = threading.Event()
+    threading.Thread(target=lambda: client.started.wait(10) and cancelled.set()).start()
+    return cancelled.is_set
+
+
+def test_cancel_does_not_wait_for_a_request_in_flight():
+    client = BlockingClient()
+    started = time.monotonic()
+    try:
+        with pytest.raises(GenerationCancelled):
+            generate_all_content(client, "Receive and file invoices.", "Invoices", use_cache=False,
+                                 should_cancel=cancel_when_started(client))
+        assert time.monotonic() - started < 3
+    finally:
+        client.release.set()
+
+
+def test_cancel_drops_requests_not_started():
+    client = BlockingClient(block_all=True)
+    try:
+        with pytest.raises(GenerationCancelled):
+            generate_all_content(client, "Receive and file invoices.", "Invoices", max_workers=1,
+                                 use_cache=False, should_cancel=cancel_when_started(client))
+    finally:
+        client.release.set()
+    time.sleep(0.3)
+    assert client.calls == 1
+
+
+class AnswerClient:
+    # Groq stand-in answering every call with `answer`, or raising it
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, messages, model, **params):
+        self.calls += 1
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        message = types.SimpleNamespace(role="assistant", content=self.answer)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def test_unreadable_flow_is_asked_again_then_falls_back():
+    client = AnswerClient("Sorry, I can't draw that.")
+    flow = get_smart_flow_data(client, "Receive and file invoices.", use_cache=False)
+    assert client.calls == pipeline.FLOW_JSON_RETRIES + 1
+    assert flow == {"nodes": [{"id": "1", "label": "Start", "type": "action"}], "edges": []}
+
+
+def test_flow_without_client_is_the_placeholder():
+    flow = get_smart_flow_data(None, "Receive and file invoices.", use_cache=False)
+    assert flow == {"nodes": [{"id": "1", "label": "Start", "type": "action"}], "edges": []}
+
+
+def test_failed_flow_request_fails_the_run():
+    client = AnswerClient(RuntimeError("invalid API key"))
+    with pytest.raises(SectionGenerationError, match="flowchart"):
+        get_smart_flow_data(client, "Receive and file invoices.", use_cache=False)
+    assert client.calls == 1
+
+
+def test_compact_prompt_drops_template_indentation():
+    prompt = compact_prompt("""
+        Write the section.
+
+
+            Keep it short.   
+        """)
+    assert prompt == "Write the section.\n\nKeep it short."
+
+
+def test_section_prompts_share_the_context_prefix():
+    context = "Receive and file invoices."
+    scope = build_section_prompt("SCOPE", context, "Invoices")
+    purpose = build_section_prompt("PURPOSE", context, "Invoices")
+    prefix = scope[:scope.index("Task:")]
+    assert purpose.startswith(prefix) and context in prefix
+
+
+def test_budget_overrun_raises_before_sending():
+    client = AnswerClient("Section text.")
+    prompt = "Write the SCOPE section. " * 50
+    with token_budget(limit=estimate_tokens(prompt) - 1) as budget:
+        with pytest.raises(TokenBudgetExceeded):
+            routed_completion(client, prompt, "section:SCOPE", use_cache=False)
+    assert client.calls == 0
+    assert budget.used == 0
+
+
+def test_budget_counts_every_call_of_a_document():
+    client = AnswerClient("Section text.")
+    prompt = "Write the SCOPE section."
+    with token_budget(limit=estimate_tokens(prompt) * 2) as budget:
+        routed_completion(client, prompt, "section:SCOPE", use_cache=False)
+        routed_completion(client, prompt, "section:SCOPE", use_cache=False)
+        with pytest.raises(TokenBudgetExceeded):
+            routed_completion(client, prompt, "section:SCOPE", use_cache=False)
+    assert client.calls == 2
+    assert budget.used == budget.limit
+
+
+FLOW = {"nodes": [{"id": "1", "label": "Receive invoice", "type": "action"},
+                  {"id": "2", "label": "File invoice", "type": "action"}],
+        "edges": [{"from": "1", "to": "2", "label": ""}]}
+
+
+def test_structured_validation_lists_the_failed_parts():
+    data = {"introduction": "Intro.", "audience": ["AP clerks", "Controllers"], "purpose": "  ", "flow": FLOW}
+    sections, flow, failed, problems = validate_structured_content(data)
+    assert sections == {"INTRODUCTION": "Intro.", "AUDIENCE": "AP clerks\nControllers"}
+    assert failed == ["PURPOSE", "SCOPE"]
+    assert flow["nodes"][0]["label"] == "Receive invoice" and problems == []
+    assert validate_structured_content("not an object")[2] == pipeline.PDD_SECTIONS + ["FLOW"]
+
+
+class StructuredClient:
+    # Groq stand-in answering the structured call with `answer` as JSON and
+    # every other call with section text; keeps the prompts it was sent
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.prompts = []
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, messages, model, response_format=None, **params):
+        prompt = messages[0]["content"]
+        self.prompts.append(prompt)
+        content = json.dumps(self.answer) if response_format else f"Re-asked {len(self.prompts)}."
+        message = types.SimpleNamespace(role="assistant", content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def test_structured_reasks_only_the_failed_sections():
+    context = "Receive and file invoices."
+    client = StructuredClient({"introduction": "Intro.", "audience": "AP clerks.", "purpose": "Pay on time.",
+                               "scope": "", "flow": FLOW})
+    sections, flow = generate_structured_content(client, context, "Invoices", use_cache=False)
+    assert len(client.prompts) == 2
+    assert client.prompts[1] == build_section_prompt("SCOPE", context, "Invoices")
+    assert sections == {"INTRODUCTION": "Intro.", "AUDIENCE": "AP clerks.", "PURPOSE": "Pay on time.",
+                        "SCOPE": "Re-asked 2."}
+    assert [node["label"] for node in flow["nodes"]] == ["Receive invoice", "File invoice"]
+
+
+def test_structured_answer_that_validates_is_one_call():
+    client = StructuredClient({"introduction": "Intro.", "audience": "AP clerks.", "purpose": "Pay on time.",
+                               "scope": "Invoices only.", "flow": FLOW})
+    sections, flow = generate_structured_content(client, "Receive and file invoices.", "Invoices", use_cache=False)
+    assert len(client.prompts) == 1
+    assert sections["SCOPE"] == "Invoices only."
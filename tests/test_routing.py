@@ -0,0 +1,78 @@
+import types
+
+import httpx
+import pytest
+from groq import APITimeoutError, RateLimitError
+
+from pipeline import estimate_tokens, routed_completion, token_budget
+from routing import FAST_MODEL, QUALITY_MODEL, SMALL_PROMPT_TOKENS, choose_route
+
+PROMPT = "Write the SCOPE section for this invoice approval process."
+
+
+def test_fast_tasks_always_use_8b():
+    for policy in ["balanced", "quality", "latency"]:
+        for task in ["summary", "merge", "flow"]:
+            assert choose_route(task, 100_000, policy).model == FAST_MODEL
+
+
+def test_policy_picks_the_section_model():
+    assert choose_route("section:SCOPE", 500, "quality") == (QUALITY_MODEL, None, "quality policy")
+    assert choose_route("section:SCOPE", 500, "latency") == (FAST_MODEL, None, "latency policy")
+    assert choose_route("section:SCOPE", 500, "balanced") == (QUALITY_MODEL, FAST_MODEL, "balanced")
+    assert choose_route("structured", 500, "balanced").fallback == FAST_MODEL
+
+
+def test_short_sections_use_8b_only_when_small():
+    assert choose_route("section:AUDIENCE", SMALL_PROMPT_TOKENS, "balanced").model == FAST_MODEL
+    assert choose_route("section:AUDIENCE", SMALL_PROMPT_TOKENS + 1, "balanced").model == QUALITY_MODEL
+    assert choose_route("section:AUDIENCE", 100, "quality").model == QUALITY_MODEL
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        choose_route("section:SCOPE", 100, "fastest")
+
+
+class ModelClient:
+    # Groq stand-in that raises `errors[model]` for that model and answers otherwise
+
+    def __init__(self, errors):
+        self.errors = errors
+        self.models = []
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, messages, model, **params):
+        self.models.append(model)
+        if model in self.errors:
+            raise self.errors[model]
+        message = types.SimpleNamespace(role="assistant", content=f"answer from {model}")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+def rate_limited():
+    response = httpx.Response(429, request=httpx.Request("POST", "https://api.groq.com"))
+    return RateLimitError("Rate limit reached", response=response, body=None)
+
+
+def timed_out():
+    return APITimeoutError(request=httpx.Request("POST", "https://api.groq.com"))
+
+
+@pytest.mark.parametrize("error", [rate_limited(), timed_out()], ids=["429", "timeout"])
+def test_70b_failure_falls_back_to_8b_charged_once(error):
+    client = ModelClient({QUALITY_MODEL: error})
+    with token_budget() as budget:
+        answer = routed_completion(client, PROMPT, "section:SCOPE", use_cache=False)
+    assert answer == f"answer from {FAST_MODEL}"
+    # no retries on the 70B route: one attempt, then the fallback
+    assert client.models == [QUALITY_MODEL, FAST_MODEL]
+    assert budget.used == estimate_tokens(PROMPT)
+
+
+def test_other_errors_do_not_fall_back():
+    client = ModelClient({QUALITY_MODEL: RuntimeError("invalid API key")})
+    with token_budget() as budget, pytest.raises(RuntimeError):
+        routed_completion(client, PROMPT, "section:SCOPE", use_cache=False)
+    assert client.models == [QUALITY_MODEL]
+    assert budget.used == 0
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import BATCH, INTERACTIVE, RateBudgetExceeded, RequestScheduler, SharedBudget
+
+MODEL = "test-model"
+
+
+def make_scheduler(rpm=0, tpm=0, shared=None):
+    # per process unless shared is given; 0 leaves a bucket unlimited
+    return RequestScheduler(limits={MODEL: {"rpm": rpm, "tpm": tpm}}, shared=shared)
+
+
+def acquire_order(scheduler, priorities):
+    # starts one waiter per priority while the model is paused, in the
+    # given order, and returns the priorities in the order they got budget
+    order, lock = [], threading.Lock()
+
+    def wait(priority):
+        scheduler.acquire(MODEL, 10, priority)
+        with lock:
+            order.append(priority)
+
+    scheduler.pause(MODEL, 0.3)
+    threads = []
+    for priority in priorities:
+        thread = threading.Thread(target=wait, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)    # queued in this order
+    for thread in threads:
+        thread.join(5)
+    return order
+
+
+def test_acquire_within_budget_does_not_wait():
+    scheduler = make_scheduler(rpm=60, tpm=6000)
+    started = time.monotonic()
+    for _ in range(5):
+        scheduler.acquire(MODEL, 100)
+    assert time.monotonic() - started < 0.2
+
+
+def test_interactive_served_before_batch():
+    order = acquire_order(make_scheduler(), [BATCH, BATCH, INTERACTIVE])
+    assert order == [INTERACTIVE, BATCH, BATCH]
+
+
+def test_interactive_served_before_batch_with_shared_budget(tmp_path):
+    shared = SharedBudget(str(tmp_path / "scheduler.sqlite3"))
+    order = acquire_order(make_scheduler(shared=shared), [BATCH, INTERACTIVE])
+    assert order == [INTERACTIVE, BATCH]
+
+
+def test_max_wait_raises_instead_of_waiting():
+    scheduler = make_scheduler()
+    scheduler.pause(MODEL, 5)
+    started = time.monotonic()
+    with pytest.raises(RateBudgetExceeded):
+        scheduler.acquire(MODEL, 10, max_wait=0.1)
+    assert time.monotonic() - started < 1
+
+
+def test_max_wait_long_enough():
+    scheduler = make_scheduler()
+    scheduler.pause(MODEL, 0.2)
+    started = time.monotonic()
+    scheduler.acquire(MODEL, 10, max_wait=2)
+    assert 0.15 < time.monotonic() - started < 1
+    # the waiter that gave up or got through is off the queue
+    assert scheduler._limiter(MODEL).waiting == []
+
+
+def test_token_budget_is_shared_between_schedulers(tmp_path):
+    # two schedulers on one file stand in for two processes
+    path = str(tmp_path / "scheduler.sqlite3")
+    first = make_scheduler(tpm=600, shared=SharedBudget(path))
+    second = make_scheduler(tpm=600, shared=SharedBudget(path))
+    first.acquire(MODEL, 600)
+    with pytest.raises(RateBudgetExceeded):
+        second.acquire(MODEL, 100, max_wait=0.1)
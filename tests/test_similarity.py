@@ -0,0 +1,64 @@
+import random
+
+from similarity import SimilarityIndex
+
+CONTENT = {
+    "short_context": "Invoices are checked and approved before payment.",
+    "sections": {"Purpose": "Pay vendors on time."},
+    "flow_data": {"nodes": [], "edges": []},
+}
+
+
+def words(seed, count=600):
+    rng = random.Random(seed)
+    return [f"w{rng.randrange(400)}" for _ in range(count)]
+
+
+def edited(text_words, every=100):
+    # one word in every `every` replaced: about 0.87 similar
+    return [("changed" if i % every == 0 else word) for i, word in enumerate(text_words)]
+
+
+def make_index(tmp_path, threshold=0.8):
+    return SimilarityIndex(str(tmp_path / "similarity.sqlite3"), threshold=threshold)
+
+
+def test_near_duplicate_above_threshold(tmp_path):
+    index = make_index(tmp_path)
+    base = words(3)
+    index.add(" ".join(base), "Invoice approval", CONTENT, {"abc": "summary"})
+    match = index.find(" ".join(edited(base)))
+    assert match is not None
+    assert 0.8 <= match["similarity"] < 1
+    assert match["title"] == "Invoice approval"
+    assert match["short_context"] == CONTENT["short_context"]
+    assert match["chunk_summaries"] == {"abc": "summary"}
+
+
+def test_same_input_is_found(tmp_path):
+    index = make_index(tmp_path)
+    text = " ".join(words(3))
+    index.add(text, "Invoice approval", CONTENT, {})
+    assert index.find(text)["similarity"] == 1
+
+
+def test_below_threshold(tmp_path):
+    index = make_index(tmp_path, threshold=0.95)
+    base = words(3)
+    index.add(" ".join(base), "Invoice approval", CONTENT, {})
+    assert index.find(" ".join(edited(base))) is None
+
+
+def test_unrelated_input(tmp_path):
+    index = make_index(tmp_path)
+    index.add(" ".join(words(3)), "Invoice approval", CONTENT, {})
+    assert index.find(" ".join(words(4))) is None
+
+
+def test_add_invalidates_earlier_lookups(tmp_path):
+    index = make_index(tmp_path)
+    base = words(3)
+    query = " ".join(edited(base))
+    assert index.find(query) is None
+    index.add(" ".join(base), "Invoice approval", CONTENT, {})
+    assert index.find(query) is not None
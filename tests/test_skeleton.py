@@ -0,0 +1,29 @@
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+
+from pipeline import build_front_matter, clone_front_matter, load_config, resolve_document_meta
+
+TODAY = "03/14/2025"
+
+
+def front_matter_parts(doc):
+    # body, headers and footers as XML, and the bytes of every picture
+    parts = [doc.element.body.xml]
+    for rel_id, rel in sorted(doc.part.rels.items()):
+        if rel.reltype in (RT.HEADER, RT.FOOTER):
+            parts.append(rel.target_part.element.xml)
+            parts.extend(sub.target_part.blob for _, sub in sorted(rel.target_part.rels.items())
+                         if sub.reltype == RT.IMAGE)
+        elif rel.reltype == RT.IMAGE:
+            parts.append(rel.target_part.blob)
+    return parts
+
+
+def test_clone_matches_a_fresh_build():
+    branding, contacts, company, clients = load_config()
+    for title in ["Kmg Invoice Approval", "Kmg Vendor <Onboarding> & Setup"]:
+        meta = resolve_document_meta(clients, branding, source_name=title.replace(" ", "_") + ".docx")
+        meta["title"] = title
+        built = build_front_matter(meta, contacts, company, TODAY)
+        cloned = clone_front_matter(meta, contacts, company, TODAY)
+        assert front_matter_parts(cloned) == front_matter_parts(built)
+        assert title in cloned.element.body.xml.replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&")
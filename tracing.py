@@ -0,0 +1,130 @@
+"""Lightweight per-run tracing of pipeline stages (wall time, tokens, sizes).
+
+    with start_trace("pdd") as trace:
+        with span("summary") as s:
+            s["output_chars"] = ...
+    trace.to_chrome_trace()   # load in chrome://tracing or Perfetto
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+_current = ContextVar("pdd_trace", default=None)
+
+
+class Trace:
+
+    def __init__(self, name="pdd"):
+        self.name = name
+        self.wall_start = time.time()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans = []
+
+    @contextmanager
+    def span(self, name, **attrs):
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            if error:
+                attrs["error"] = error
+            record = {
+                "name": name,
+                "start_ms": (start - self._origin) * 1000,
+                "duration_ms": (end - start) * 1000,
+                "thread": threading.current_thread().name,
+                "attrs": attrs,
+            }
+            with self._lock:
+                self.spans.append(record)
+
+    def rows(self):
+        # flat, start-ordered view for tables in the UI
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        return [
+            dict(stage=s["name"], start_ms=round(s["start_ms"], 1),
+                 duration_ms=round(s["duration_ms"], 1), **s["attrs"])
+            for s in spans
+        ]
+
+    def totals(self):
+        totals = {"prompt_tokens": 0, "completion_tokens": 0, "retries": 0, "llm_calls": 0, "cache_hits": 0,
+                  "fallbacks": 0}
+        with self._lock:
+            for s in self.spans:
+                attrs = s["attrs"]
+                totals["prompt_tokens"] += attrs.get("prompt_tokens", 0) or 0
+                totals["completion_tokens"] += attrs.get("completion_tokens", 0) or 0
+                totals["retries"] += attrs.get("retries", 0) or 0
+                totals["fallbacks"] += 1 if attrs.get("routed_from") else 0
+                if "model" in attrs:
+                    totals["llm_calls"] += 1
+                    totals["cache_hits"] += 1 if attrs.get("cached") else 0
+            totals["wall_ms"] = max((s["start_ms"] + s["duration_ms"] for s in self.spans), default=0.0)
+        return totals
+
+    def to_dict(self):
+        return {"name": self.name, "started_at": self.wall_start,
+                "totals": self.totals(), "spans": self.rows()}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, default=str)
+
+    def to_chrome_trace(self):
+        # Trace Event Format, "X" (complete) events in microseconds
+        threads = {}
+        events = []
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            tid = threads.setdefault(s["thread"], len(threads) + 1)
+            events.append({
+                "name": s["name"], "ph": "X", "pid": 1, "tid": tid,
+                "ts": round(s["start_ms"] * 1000), "dur": round(s["duration_ms"] * 1000),
+                "args": s["attrs"],
+            })
+        for thread_name, tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                           "args": {"name": thread_name}})
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms",
+                           "otherData": {"trace": self.name}}, default=str)
+
+
+@contextmanager
+def start_trace(name="pdd"):
+    trace = Trace(name)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def span(name, **attrs):
+    # no-op (but still yields a dict to write into) when nothing is being traced
+    trace = _current.get()
+    if trace is None:
+        yield attrs
+        return
+    with trace.span(name, **attrs) as record:
+        yield record
+
+
+def submit(pool, fn, *args, **kwargs):
+    # thread pools don't inherit context variables; carry the trace over
+    return pool.submit(copy_context().run, fn, *args, **kwargs)